@@ -1,8 +1,10 @@
 from .appointments import appointments_router
+from .catalog import catalog_router
 from .customers import customers_router
 from .masters import masters_router
 from .offerings import offerings_router
 from .services import services_router
+from .stats import stats_router
 
 
 routers = [
@@ -10,5 +12,7 @@ routers = [
     customers_router,
     services_router,
     masters_router,
-    offerings_router
+    offerings_router,
+    catalog_router,
+    stats_router
 ]
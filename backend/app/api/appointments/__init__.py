@@ -1,11 +1,12 @@
 from fastapi import APIRouter
 
 from .basic_routes import basic_router
+from .bundle_routes import bundle_router
 from .confirmation_routes import confirmation_router
 
 
 appointments_router = APIRouter(prefix='/appointments')
 
-child_routers = [basic_router, confirmation_router]
+child_routers = [basic_router, bundle_router, confirmation_router]
 for router in child_routers:
     appointments_router.include_router(router)
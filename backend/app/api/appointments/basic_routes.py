@@ -1,26 +1,28 @@
 import secrets
-import logging
-import json
-from datetime import date, timedelta
-from fastapi import status, Body, Query, Path, Depends, HTTPException
-from faststream.rabbit.fastapi import RabbitRouter
-from sqlalchemy import select, insert, delete
-from sqlalchemy.orm import joinedload
+from datetime import date, datetime, time, timedelta
+from fastapi import APIRouter, status, Body, Query, Path, Depends, HTTPException, Response
+from sqlalchemy import select, delete
+from sqlalchemy.orm import contains_eager, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
-from api.offerings.utils import is_slot_busy, generate_time_slots_for_now
+from api.catalog import get_offering
+from api.offerings.utils import (
+    get_masters_blocks,
+    is_slot_blocked,
+    is_slot_on_grid,
+    update_occupancy
+)
 from core.auth import verify_token
 from core.schemas import AppointmentCreate, AppointmentGet
-from db.models import Offering, Customer, Appointment, Occupation
+from db.models import Offering, Appointment, Occupation
 from db.postgresql import get_session
-from db.queries import select_one
-from rabbitmq.config import RMQ_URL
-
+from db.queries import select_one, select_page
+from rabbitmq.outbox import outbox_relay
+from .utils import build_booking_statement, booking_row_to_appointment
 
-basic_router = RabbitRouter(RMQ_URL)
 
-logger = logging.getLogger(__name__)
+basic_router = APIRouter()
 
 
 @basic_router.get(
@@ -30,31 +32,63 @@ logger = logging.getLogger(__name__)
 )
 async def get_appointments(
     session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
     date: Annotated[date | None, Query()] = None,
-    confirmed: Annotated[bool | None, Query()] = None
+    date_from: Annotated[date | None, Query()] = None,
+    date_to: Annotated[date | None, Query()] = None,
+    confirmed: Annotated[bool | None, Query()] = None,
+    master_id: Annotated[int | None, Query()] = None,
+    cursor: Annotated[str | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1, le=500)] = None
 ):
-    """Получение всех записей"""
-    query = (
-        select(Appointment)
-        .options(
-            joinedload(Appointment.customer),
-            joinedload(Appointment.offering).joinedload(Offering.master),
-            joinedload(Appointment.offering).joinedload(Offering.service),
-            joinedload(Appointment.slot)
-        )
-    )
+    """Получение записей (новые первыми).
+
+    Период записи задаётся датой ``date`` или датами ``date_from`` и
+    ``date_to`` (включительно). При указании ``limit`` отдаётся не больше
+    ``limit`` записей, а курсор следующей страницы передаётся в заголовке
+    ``X-Next-Cursor``.
+    """
+    if date is not None:
+        date_from = date_to = date
+    filters = []
     # Фильтрация по подтверждённости
     if confirmed is not None:
-        query = query.where(Appointment.confirmed == confirmed)
-    # Фильтрация по дате записи
-    if date is not None:
-        query = query.where(
-            Occupation.start >= date,
-            Occupation.start < date + timedelta(days=1)
+        filters.append(Appointment.confirmed == confirmed)
+    # Фильтрация по мастеру
+    if master_id is not None:
+        filters.append(
+            Appointment.offering_id.in_(
+                select(Offering.id).where(Offering.master_id == master_id)
+            )
         )
-    # Получение результата
-    result = await session.execute(query)
-    return result.scalars().all()
+    # Фильтрация по дате записи (по занятому времени записи)
+    if date_from is not None:
+        filters.append(Occupation.start >= datetime.combine(date_from, time()))
+    if date_to is not None:
+        filters.append(
+            Occupation.start < datetime.combine(date_to + timedelta(days=1), time())
+        )
+    # Получение результата: слот берётся из соединения, остальные связи
+    # загружаются отдельными запросами по id (без размножения строк)
+    appointments, next_cursor = await select_page(
+        session,
+        Appointment,
+        filters,
+        options=[
+            contains_eager(Appointment.slot),
+            selectinload(Appointment.customer),
+            selectinload(Appointment.offering).options(
+                selectinload(Offering.master),
+                selectinload(Offering.service)
+            )
+        ],
+        cursor=cursor,
+        limit=limit,
+        outerjoins=[(Occupation, Occupation.id == Appointment.occupation_id)]
+    )
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return appointments
 
 
 @basic_router.post(
@@ -67,43 +101,16 @@ async def create_new_appointment(
     appointment: Annotated[AppointmentCreate, Body()]
 ):
     """Запись на приём к мастеру"""
-    # 1. Поиск пользователя по номеру телефона (с созданием нового по надобности)
-    customer = await select_one(session, Customer, {'phone': appointment.phone})
-    if customer is None:
-        result = await session.execute(
-            insert(Customer)
-            .values(
-                phone=appointment.phone,
-                name=appointment.name,
-                status='active'
-            ).returning(Customer)
-        )
-        customer = result.scalar_one()
-    else:
-        # Проверка, что пользователь не заблокирован
-        if customer.status == 'blocked':
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='User with this phone number has been blocked'
-            )
-    
-    # 2. Поиск услуги мастера по id
-    offering = await select_one(session, Offering, {'id': appointment.offering_id})
+    # 1. Услуга мастера из каталога (до записи в БД)
+    offering = await get_offering(session, appointment.offering_id)
     if offering is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Offering with such id doesn\'t exist'
         )
-    
-    # 3. Проверка на свободность выбираемого времени
-    slots_result = await session.execute(
-        select(Occupation).where(Occupation.master_id == offering.master_id)
-    )
-    occupations = slots_result.scalars().all()
-    busy_intervals = [(el.start, el.end) for el in occupations]
-
-    # Проверка на стандартные ограничения
-    if appointment.datetime not in generate_time_slots_for_now(
+    # 2. Проверка на стандартные ограничения
+    if not is_slot_on_grid(
+        appointment.datetime,
         offering.duration.hour,
         offering.duration.minute
     ):
@@ -111,71 +118,49 @@ async def create_new_appointment(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='This time is incorrect'
         )
-    # Проверка на попадание в занятые слоты
-    offering_duration = timedelta(
-        hours=offering.duration.hour,
-        minutes=offering.duration.minute
-    )
-    if is_slot_busy(appointment.datetime, busy_intervals, offering_duration):
+    # 3. Проверка на регулярные блокировки времени мастера
+    blocks = await get_masters_blocks(session)
+    if is_slot_blocked(
+        blocks.get(offering.master.id, []),
+        appointment.datetime,
+        timedelta(hours=offering.duration.hour, minutes=offering.duration.minute)
+    ):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_409_CONFLICT,
             detail='This time is not available now'
         )
 
-    # 4. Забиваем временной слот у мастера
-    occupation_result = await session.execute(
-        insert(Occupation)
-        .values(
-            master_id=offering.master_id,
-            start=appointment.datetime,
-            end=appointment.datetime + timedelta(
-                hours=offering.duration.hour,
-                minutes=offering.duration.minute,
-                seconds=offering.duration.second
-            )
-        ).returning(Occupation.id)
-    )
-
-    # 5. Создаём запись в бд
+    # 4. Клиент, услуга мастера, занятость и запись - одним запросом
+    # (пересечение с занятым временем отклоняется ограничением в БД -> 409)
     result = await session.execute(
-        insert(Appointment)
-        .values(
+        build_booking_statement(
             name=appointment.name,
-            customer_id=customer.id,
-            offering_id=offering.id,
-            occupation_id=occupation_result.scalar_one(),
+            phone=appointment.phone,
+            offering_id=appointment.offering_id,
+            start=appointment.datetime,
             secret_code=''.join(str(secrets.randbelow(10)) for _ in range(5))
-        ).returning(Appointment)
-        .options(
-            joinedload(Appointment.customer),
-            joinedload(Appointment.offering).joinedload(Offering.master),
-            joinedload(Appointment.offering).joinedload(Offering.service),
-            joinedload(Appointment.slot)
         )
     )
-    new_appointment = result.scalar_one()
-    
-    # 6. Сохраняем изменения
-    await session.commit()
-    await session.refresh(new_appointment)
+    row = result.one()
 
-    # 7. Отправляем уведомление с кодом подтверждения
-    try:
-        await basic_router.broker.publish(
-            json.dumps({
-                'message': 'confirmation',
-                'detail': {
-                    'phone': new_appointment.phone,
-                    'code': new_appointment.secret_code
-                }
-            }),
-            queue='whatsapp_notifications'
+    # 5. Проверка, что пользователь не заблокирован и услуга ещё существует
+    # (при ошибке изменения не сохраняются и откатываются вместе с сессией)
+    if row.customer_status == 'blocked':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='User with this phone number has been blocked'
         )
-        logger.debug(f"[DEBUG] WebSocket broadcast result: {result}, phone: {new_appointment.phone}, code: {new_appointment.secret_code}")
-    except Exception as e:
-        logger.error(f"[ERROR] WebSocket broadcast failed: {e}")
-    
-    return new_appointment
+    if row.offering_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Offering with such id doesn\'t exist'
+        )
+
+    # 6. Сохраняем изменения (уведомление с кодом отправится из outbox)
+    await session.commit()
+    outbox_relay.notify()
+    update_occupancy(row.master_id, row.slot_start, row.slot_end, occupied=True)
+    return AppointmentGet.model_validate(booking_row_to_appointment(row))
 
 
 @basic_router.delete(
@@ -203,10 +188,16 @@ async def delete_appointment(
         delete(Appointment).where(Appointment.id == appointment_id)
     )
     # Удаляем связанный слот времени, если он существует
+    occupation = None
     if occupation_id:
-        await session.execute(
-            delete(Occupation).where(Occupation.id == occupation_id)
+        result = await session.execute(
+            delete(Occupation)
+            .where(Occupation.id == occupation_id)
+            .returning(Occupation.master_id, Occupation.start, Occupation.end)
         )
+        occupation = result.one_or_none()
     await session.commit()
+    if occupation is not None:
+        update_occupancy(*occupation, occupied=False)
 
     return None
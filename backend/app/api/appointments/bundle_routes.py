@@ -0,0 +1,191 @@
+import secrets
+from datetime import timedelta
+from fastapi import APIRouter, status, Body, Query, Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated
+
+from api.catalog import get_offering
+from api.offerings.utils import (
+    bundle_offsets,
+    get_masters_blocks,
+    get_masters_occupancy,
+    get_slot_days,
+    is_slot_blocked,
+    is_slot_on_grid,
+    iter_day_bundle_slots,
+    update_occupancy
+)
+from core.schemas import BundleCreate, BundleSlot, AppointmentGet, OfferingGet
+from db.models import Appointment, Occupation, NotificationOutbox, appointment_bundle_seq
+from db.postgresql import get_session
+from rabbitmq.outbox import confirmation_notification, outbox_relay
+from .utils import build_customer_upsert
+
+
+bundle_router = APIRouter(prefix='/bundle')
+
+
+async def get_bundle_offerings(
+    session: AsyncSession,
+    offering_ids: list[int]
+) -> list[OfferingGet]:
+    """Получение услуг мастеров цепочки из каталога (в порядке цепочки)"""
+    offerings = []
+    for offering_id in offering_ids:
+        offering = await get_offering(session, offering_id)
+        if offering is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Offering with such id doesn\'t exist'
+            )
+        offerings.append(offering)
+    return offerings
+
+
+def offering_duration(offering: OfferingGet) -> timedelta:
+    """Длительность услуги мастера"""
+    return timedelta(hours=offering.duration.hour, minutes=offering.duration.minute)
+
+
+@bundle_router.get('/slots/', response_model=list[BundleSlot])
+async def get_bundle_slots(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    offering_ids: Annotated[
+        list[int], Query(alias='offering_id', min_length=1, max_length=5)
+    ]
+):
+    """Получение времени, в которое можно записаться на несколько услуг подряд"""
+    offerings = await get_bundle_offerings(session, offering_ids)
+    durations = [offering_duration(offering) for offering in offerings]
+    offsets = bundle_offsets(durations)
+    # Занятость всех мастеров цепочки одним запросом
+    days = get_slot_days()
+    occupancy = await get_masters_occupancy(
+        session,
+        [offering.master.id for offering in offerings],
+        days
+    )
+    result = []
+    for day in days:
+        busy_masks = [occupancy[offering.master.id][day] for offering in offerings]
+        for start in iter_day_bundle_slots(day, busy_masks, durations):
+            result.append({
+                'start': start,
+                'slots': [
+                    {'start': start + offset, 'end': start + offset + duration}
+                    for offset, duration in zip(offsets, durations)
+                ]
+            })
+    return result
+
+
+@bundle_router.post(
+    '/',
+    response_model=list[AppointmentGet],
+    status_code=status.HTTP_201_CREATED
+)
+async def create_bundle_appointment(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    bundle: Annotated[BundleCreate, Body()]
+):
+    """Запись на несколько услуг подряд (в том числе к разным мастерам)"""
+    # 1. Услуги мастеров и время каждой из них
+    offerings = await get_bundle_offerings(session, bundle.offering_ids)
+    durations = [offering_duration(offering) for offering in offerings]
+    starts = [bundle.datetime + offset for offset in bundle_offsets(durations)]
+
+    # 2. Проверка на стандартные ограничения и регулярные блокировки
+    blocks = await get_masters_blocks(session)
+    for offering, start, duration in zip(offerings, starts, durations):
+        if not is_slot_on_grid(start, offering.duration.hour, offering.duration.minute):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='This time is incorrect'
+            )
+        if is_slot_blocked(blocks.get(offering.master.id, []), start, duration):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail='This time is not available now'
+            )
+
+    # 3. Клиент и проверка, что он не заблокирован
+    customer = (
+        await session.execute(build_customer_upsert(bundle.name, bundle.phone))
+    ).one()
+    if customer.status == 'blocked':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='User with this phone number has been blocked'
+        )
+
+    # 4. Занимаем время всех мастеров в одной транзакции
+    # (пересечение с занятым временем отклоняется ограничением в БД -> 409)
+    occupations = (await session.execute(
+        insert(Occupation).returning(
+            Occupation.id, Occupation.master_id, Occupation.start, Occupation.end,
+            sort_by_parameter_order=True
+        ),
+        [
+            {
+                'master_id': offering.master.id,
+                'start': start,
+                'end': start + duration
+            }
+            for offering, start, duration in zip(offerings, starts, durations)
+        ]
+    )).all()
+
+    # 5. Создаём записи цепочки с общим кодом подтверждения
+    # (подтверждаются и удаляются они тоже вместе)
+    secret_code = ''.join(str(secrets.randbelow(10)) for _ in range(5))
+    bundle_id = await session.scalar(appointment_bundle_seq.next_value())
+    appointments = (await session.execute(
+        insert(Appointment).returning(
+            Appointment.id,
+            Appointment.name,
+            Appointment.confirmed,
+            Appointment.created_at,
+            sort_by_parameter_order=True
+        ),
+        [
+            {
+                'name': bundle.name,
+                'customer_id': customer.id,
+                'offering_id': offering.id,
+                'occupation_id': occupation.id,
+                'secret_code': secret_code,
+                'bundle_id': bundle_id
+            }
+            for offering, occupation in zip(offerings, occupations)
+        ]
+    )).all()
+
+    # 6. Одно уведомление с кодом подтверждения на всю цепочку
+    await session.execute(
+        insert(NotificationOutbox)
+        .values(**confirmation_notification(customer.phone, secret_code))
+    )
+
+    # 7. Сохраняем изменения
+    await session.commit()
+    outbox_relay.notify()
+    for occupation in occupations:
+        update_occupancy(
+            occupation.master_id, occupation.start, occupation.end, occupied=True
+        )
+    new_appointments = [
+        AppointmentGet.model_validate({
+            'id': appointment.id,
+            'name': appointment.name,
+            'phone': customer.phone,
+            'offering': offering,
+            'slot': {'start': occupation.start, 'end': occupation.end},
+            'confirmed': appointment.confirmed,
+            'bundle_id': bundle_id,
+            'created_at': appointment.created_at
+        })
+        for appointment, offering, occupation in zip(appointments, offerings, occupations)
+    ]
+
+    return new_appointments
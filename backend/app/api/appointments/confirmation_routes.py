@@ -1,21 +1,26 @@
-import logging
-import json
-from fastapi import status, Body, Path, Depends, HTTPException
-from faststream.rabbit.fastapi import RabbitRouter
-from sqlalchemy import update
+from fastapi import APIRouter, status, Body, Path, Depends, HTTPException
+from sqlalchemy import ColumnElement, select, insert, update, delete, or_
+from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
+from api.offerings.utils import update_occupancy
 from core.auth import verify_token
 from core.schemas import OKModel, ConfirmationCode
-from db.models import Appointment
+from db.models import Appointment, Occupation, NotificationOutbox
 from db.postgresql import get_session
 from db.queries import select_one
-from rabbitmq.config import RMQ_URL
+from rabbitmq.outbox import confirmation_notification, outbox_relay
 
 
-confirmation_router = RabbitRouter(RMQ_URL)
-logger = logging.getLogger(__name__)
+confirmation_router = APIRouter()
+
+
+def chain_filter(appointment: Appointment) -> ColumnElement[bool]:
+    """Условие на все записи цепочки (или на одну запись вне цепочки)"""
+    if appointment.bundle_id is not None:
+        return Appointment.bundle_id == appointment.bundle_id
+    return Appointment.id == appointment.id
 
 
 @confirmation_router.post(
@@ -27,31 +32,27 @@ async def refresh_confirmation_code(
     appointment_id: Annotated[int, Path()]
 ):
     """Получение кода для подтверждения записи"""
-    appointment = await select_one(session, Appointment, {'id': appointment_id})
+    # Номер телефона берётся у клиента записи
+    result = await session.execute(
+        select(Appointment)
+        .options(joinedload(Appointment.customer))
+        .where(Appointment.id == appointment_id)
+    )
+    appointment = result.scalar_one_or_none()
     if appointment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Appointment with such id doesn\'t exist'
         )
     
-    try:
-        await confirmation_router.broker.publish(
-            json.dumps({
-                'message': 'confirmation',
-                'detail': {
-                    'phone': appointment.phone,
-                    'code': appointment.secret_code
-                }
-            }),
-            queue='whatsapp_notifications'
-        )
-        return {'message': 'OK'}
-    except Exception as e:
-        logger.error(f'RabbitMQ error: {e}')
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail='Cannot send code to notificating devices'
-        )
+    # Уведомление отправится из outbox
+    await session.execute(
+        insert(NotificationOutbox)
+        .values(**confirmation_notification(appointment.phone, appointment.secret_code))
+    )
+    await session.commit()
+    outbox_relay.notify()
+    return {'message': 'OK'}
 
 
 @confirmation_router.post(
@@ -72,20 +73,46 @@ async def confirm_appointment_using_code(
         )
     if appointment.confirmed:
         return {'message': 'OK'}
+    # Попытки, подтверждение и удаление - общие для всей цепочки записей
+    chain = chain_filter(appointment)
     if appointment.secret_code != confirmation_code.confirmation_code:
-        appointment.attempts -= 1
+        attempts = appointment.attempts - 1
+        await session.execute(
+            update(Appointment)
+            .where(chain)
+            .values(attempts=Appointment.attempts - 1)
+        )
         msg = 'Confirmation code incorrect'
-        if appointment.attempts <= 0:
-            await session.delete(appointment)
+        occupations = []
+        if attempts <= 0:
+            deleted = await session.execute(
+                delete(Appointment)
+                .where(chain)
+                .returning(Appointment.occupation_id)
+            )
+            occupation_ids = [
+                occupation_id for occupation_id in deleted.scalars()
+                if occupation_id is not None
+            ]
+            # Освобождаем занятое записями время мастеров
+            if occupation_ids:
+                result = await session.execute(
+                    delete(Occupation)
+                    .where(Occupation.id.in_(occupation_ids))
+                    .returning(Occupation.master_id, Occupation.start, Occupation.end)
+                )
+                occupations = result.all()
             msg = 'Confirmation code incorrect. Appointment was deleted'
         await session.commit()
+        for occupation in occupations:
+            update_occupancy(*occupation, occupied=False)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=msg
         )
     result = await session.execute(
         update(Appointment)
-        .where(Appointment.id == appointment_id)
+        .where(chain)
         .values(confirmed=True)
     )
     if result.rowcount == 0:
@@ -106,11 +133,16 @@ async def confirm_appointment_as_admin(
     session: Annotated[AsyncSession, Depends(get_session)],
     appointment_id: Annotated[int, Path()]
 ):
-    """Подтверждение записи по её id"""
+    """Подтверждение записи по её id (вместе с остальными записями цепочки)"""
+    bundle_id = (
+        select(Appointment.bundle_id)
+        .where(Appointment.id == appointment_id)
+        .scalar_subquery()
+    )
     result = await session.execute(
         update(Appointment)
         .values(confirmed=True)
-        .where(Appointment.id == appointment_id)
+        .where(or_(Appointment.id == appointment_id, Appointment.bundle_id == bundle_id))
     )
     # Если записей с таким id не существовало
     if result.rowcount == 0:
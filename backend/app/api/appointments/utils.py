@@ -0,0 +1,189 @@
+from datetime import datetime
+from sqlalchemy import Insert, Select, String, func, select, insert, literal, cast, true
+from sqlalchemy.dialects.postgresql import INTERVAL, insert as pg_insert
+from sqlalchemy.types import DateTime
+
+from db.models import (
+    Customer, Offering, Master, Service, Occupation, Appointment, NotificationOutbox
+)
+from rabbitmq.config import NOTIFICATIONS_QUEUE
+
+
+def build_customer_upsert(name: str, phone: str) -> Insert:
+    """Получение клиента по нормализованному номеру телефона (с созданием нового)"""
+    return (
+        pg_insert(Customer)
+        .values(phone=phone, name=name, status='active')
+        .on_conflict_do_update(
+            index_elements=[Customer.phone_key],
+            # Существующего клиента не меняем, но получаем его через RETURNING
+            set_={'name': Customer.name}
+        )
+        .returning(Customer.id, Customer.phone, Customer.status)
+    )
+
+
+def build_booking_statement(
+    name: str,
+    phone: str,
+    offering_id: int,
+    start: datetime,
+    secret_code: str
+) -> Select:
+    """Построение единого запроса на запись к мастеру.
+
+    За одно обращение к БД находит (или создаёт) клиента, получает услугу
+    мастера, занимает время, создаёт запись и уведомление с кодом
+    подтверждения в outbox. Возвращает одну строку со всеми
+    данными для ``AppointmentGet``; если клиент заблокирован или услуги нет,
+    поля записи в строке будут пустыми.
+    """
+    # 1. Клиент по нормализованному номеру телефона (с созданием нового)
+    customer = build_customer_upsert(name, phone).cte('customer')
+
+    # 2. Услуга мастера по id
+    offering = (
+        select(
+            Offering.id,
+            Offering.master_id,
+            Offering.service_id,
+            Offering.price,
+            Offering.duration
+        )
+        .where(Offering.id == offering_id)
+        .cte('offering')
+    )
+
+    # 3. Забиваем временной слот у мастера (только для незаблокированных)
+    start_param = literal(start, DateTime)
+    occupation = (
+        insert(Occupation)
+        .from_select(
+            ['master_id', 'start', 'end'],
+            select(
+                offering.c.master_id,
+                start_param,
+                start_param + cast(offering.c.duration, INTERVAL)
+            )
+            .select_from(offering)
+            .join(customer, true())
+            .where(customer.c.status != 'blocked')
+        )
+        .returning(Occupation.id, Occupation.start, Occupation.end)
+        .cte('occupation')
+    )
+
+    # 4. Создаём запись
+    appointment = (
+        insert(Appointment)
+        .from_select(
+            [
+                'name', 'customer_id', 'offering_id', 'occupation_id',
+                'secret_code', 'confirmed', 'attempts'
+            ],
+            select(
+                literal(name),
+                customer.c.id,
+                offering.c.id,
+                occupation.c.id,
+                literal(secret_code),
+                literal(False),
+                # Python-умолчания модели внутри CTE не подставляются
+                literal(Appointment.__table__.c.attempts.default.arg)
+            )
+            .select_from(occupation)
+            .join(customer, true())
+            .join(offering, true()),
+            include_defaults=False
+        )
+        .returning(
+            Appointment.id,
+            Appointment.name,
+            Appointment.occupation_id,
+            Appointment.confirmed,
+            Appointment.secret_code,
+            Appointment.created_at
+        )
+        .cte('appointment')
+    )
+
+    # 5. Уведомление с кодом подтверждения (только для созданной записи)
+    outbox = (
+        insert(NotificationOutbox)
+        .from_select(
+            ['queue', 'payload'],
+            select(
+                literal(NOTIFICATIONS_QUEUE, String),
+                func.jsonb_build_object(
+                    literal('message', String), literal('confirmation', String),
+                    literal('detail', String), func.jsonb_build_object(
+                        literal('phone', String), customer.c.phone,
+                        literal('code', String), appointment.c.secret_code
+                    )
+                )
+            )
+            .select_from(appointment)
+            .join(customer, true()),
+            include_defaults=False
+        )
+        .cte('outbox')
+    )
+
+    # 6. Итоговая строка со всеми связанными данными
+    return (
+        select(
+            customer.c.phone.label('customer_phone'),
+            customer.c.status.label('customer_status'),
+            offering.c.id.label('offering_id'),
+            offering.c.price.label('offering_price'),
+            offering.c.duration.label('offering_duration'),
+            Master.id.label('master_id'),
+            Master.phone.label('master_phone'),
+            Master.name.label('master_name'),
+            Service.id.label('service_id'),
+            Service.name.label('service_name'),
+            appointment.c.id,
+            appointment.c.name,
+            appointment.c.confirmed,
+            appointment.c.secret_code,
+            appointment.c.created_at,
+            occupation.c.start.label('slot_start'),
+            occupation.c.end.label('slot_end')
+        )
+        .select_from(customer)
+        .outerjoin(offering, true())
+        .outerjoin(Master, Master.id == offering.c.master_id)
+        .outerjoin(Service, Service.id == offering.c.service_id)
+        .outerjoin(appointment, true())
+        .outerjoin(occupation, occupation.c.id == appointment.c.occupation_id)
+        .add_cte(outbox)
+    )
+
+
+def booking_row_to_appointment(row) -> dict:
+    """Преобразование строки запроса на запись в данные для ``AppointmentGet``"""
+    return {
+        'id': row.id,
+        'name': row.name,
+        'phone': row.customer_phone,
+        'offering': {
+            'id': row.offering_id,
+            'price': row.offering_price,
+            'duration': row.offering_duration,
+            'master': {
+                'id': row.master_id,
+                'phone': row.master_phone,
+                'name': row.master_name
+            },
+            'service': {
+                'id': row.service_id,
+                'name': row.service_name
+            }
+        },
+        'slot': {
+            'start': row.slot_start,
+            'end': row.slot_end
+        },
+        'confirmed': row.confirmed,
+        'created_at': row.created_at
+    }
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from hashlib import sha1
+from fastapi import APIRouter, Depends, Header, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated
+
+from core.cache import VersionedCache
+from core.schemas import Catalog, OfferingGet
+from db.models import Master, Offering, Service
+from db.postgresql import get_session
+from db.queries import select_all
+
+
+catalog_router = APIRouter(prefix='/catalog')
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Готовый к отдаче снимок каталога"""
+    catalog: Catalog
+    body: bytes
+    etag: str
+    offerings: dict[int, OfferingGet]
+
+
+# Версия каталога повышается маршрутами изменения мастеров, услуг и услуг мастеров;
+# изменения, сделанные другими процессами, подхватываются не позже чем через TTL
+CATALOG_TTL_SECONDS = 30
+catalog_cache: VersionedCache[CatalogSnapshot] = VersionedCache(ttl=CATALOG_TTL_SECONDS)
+
+
+async def get_catalog(session: AsyncSession) -> CatalogSnapshot:
+    """Получение снимка каталога (из БД только при смене версии)"""
+    snapshot = catalog_cache.get()
+    if snapshot is not None:
+        return snapshot
+
+    version = catalog_cache.version
+    offerings = await session.execute(
+        select(Offering)
+        .options(joinedload(Offering.master), joinedload(Offering.service))
+        .order_by(Offering.id)
+    )
+    catalog = Catalog.model_validate({
+        'services': await select_all(session, Service),
+        'masters': await select_all(session, Master),
+        'offerings': offerings.scalars().all()
+    })
+    body = catalog.model_dump_json().encode()
+    snapshot = CatalogSnapshot(
+        catalog=catalog,
+        body=body,
+        etag=f'"{sha1(body).hexdigest()}"',
+        offerings={offering.id: offering for offering in catalog.offerings}
+    )
+    catalog_cache.set(snapshot, version)
+    return snapshot
+
+
+async def get_offering(
+    session: AsyncSession,
+    offering_id: int
+) -> OfferingGet | None:
+    """Получение услуги мастера по id из снимка каталога"""
+    snapshot = await get_catalog(session)
+    return snapshot.offerings.get(offering_id)
+
+
+@catalog_router.get(
+    '/',
+    response_model=Catalog,
+    responses={status.HTTP_304_NOT_MODIFIED: {'description': 'Not Modified'}}
+)
+async def get_catalog_document(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    """Получение всего каталога салона одним документом (с поддержкой ETag)"""
+    snapshot = await get_catalog(session)
+    headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+    # Клиент уже имеет актуальную версию каталога
+    if if_none_match is not None:
+        etags = [etag.strip().removeprefix('W/') for etag in if_none_match.split(',')]
+        if '*' in etags or snapshot.etag in etags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=snapshot.body,
+        media_type='application/json',
+        headers=headers
+    )
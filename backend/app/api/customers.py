@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, Body, Path, HTTPException, status
+from datetime import date, datetime, time, timedelta
+from fastapi import APIRouter, Depends, Body, Path, Query, HTTPException, Response, status
+from sqlalchemy import select, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
 from core.auth import verify_token
 from core.schemas import CustomerGet, CustomersStatusUpdate
+from core.utils import escape_like, normalize_phone
 from db.models import Customer
 from db.postgresql import get_session
-from db.queries import select_all, select_one
+from db.queries import select_one, select_page
 
 
 customers_router = APIRouter(prefix='/customers')
 
+# Минимальное число цифр в запросе для поиска по номеру телефона
+MIN_PHONE_SEARCH_DIGITS = 3
+
 
 @customers_router.get(
     '/',
@@ -18,13 +24,82 @@ customers_router = APIRouter(prefix='/customers')
     dependencies=[Depends(verify_token)]
 )
 async def get_customers(
-    session: Annotated[AsyncSession, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    customer_status: Annotated[str | None, Query(alias='status', max_length=10)] = None,
+    created_from: Annotated[date | None, Query()] = None,
+    created_to: Annotated[date | None, Query()] = None,
+    cursor: Annotated[str | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1, le=500)] = None
 ):
-    """Получение всех клиентов, записывавшихся когда-либо"""
-    customers = await select_all(session, Customer)
+    """Получение клиентов, записывавшихся когда-либо (новые первыми).
+
+    Фильтры: ``status`` и период создания ``created_from``-``created_to``
+    (включительно). При указании ``limit`` отдаётся не больше ``limit``
+    клиентов, а курсор следующей страницы передаётся в заголовке
+    ``X-Next-Cursor``.
+    """
+    filters = []
+    if customer_status is not None:
+        filters.append(Customer.status == customer_status)
+    if created_from is not None:
+        filters.append(Customer.created_at >= datetime.combine(created_from, time()))
+    if created_to is not None:
+        filters.append(
+            Customer.created_at < datetime.combine(created_to + timedelta(days=1), time())
+        )
+    customers, next_cursor = await select_page(
+        session, Customer, filters, cursor=cursor, limit=limit
+    )
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
     return customers
 
 
+@customers_router.get(
+    '/search/',
+    response_model=list[CustomerGet],
+    dependencies=[Depends(verify_token)]
+)
+async def search_customers(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    q: Annotated[str, Query(min_length=2, max_length=100)],
+    customer_status: Annotated[str | None, Query(alias='status', max_length=10)] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
+):
+    """Поиск клиентов по имени или номеру телефона (самые похожие первыми).
+
+    Имя ищется по подстроке и по похожести, номер телефона - по подстроке
+    из цифр запроса. Условия поддерживаются триграммными GIN-индексами.
+    Фильтр ``status`` применяется до ограничения ``limit``.
+    """
+    name_pattern = f'%{escape_like(q)}%'
+    conditions = [
+        Customer.name.ilike(name_pattern, escape='\\'),
+        Customer.name.op('%')(q)
+    ]
+    rank = func.similarity(Customer.name, q)
+    # Поиск по номеру телефона, если в запросе есть хотя бы 3 цифры
+    # (более короткий шаблон не обслуживается триграммным индексом
+    # и совпадает почти со всеми клиентами)
+    digits = normalize_phone(q)
+    if len(digits) >= MIN_PHONE_SEARCH_DIGITS:
+        conditions.append(Customer.phone_key.like(f'%{digits}%'))
+        rank = func.greatest(rank, func.similarity(Customer.phone_key, digits))
+
+    filters = [or_(*conditions)]
+    if customer_status is not None:
+        filters.append(Customer.status == customer_status)
+
+    result = await session.execute(
+        select(Customer)
+        .where(*filters)
+        .order_by(rank.desc(), Customer.id.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
 @customers_router.patch(
     '/{phone}/status/',
     response_model=CustomerGet,
@@ -36,7 +111,11 @@ async def change_customers_status(
     new_status: Annotated[CustomersStatusUpdate, Body()]
 ):
     """Обновление статуса у пользователя по номеру телефона"""
-    customer = await select_one(session, Customer, {'phone': phone})
+    customer = await select_one(
+        session,
+        Customer,
+        {'phone_key': normalize_phone(phone)}
+    )
     if customer is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, status, Body, Depends, Path, HTTPException
-from sqlalchemy import update
+from sqlalchemy import insert, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
+from api.catalog import catalog_cache
+from api.offerings.utils import blocks_cache, get_masters_blocks, is_block_time_on_grid
 from core.auth import verify_token
-from core.schemas import MasterInfo, MasterDB
-from db.models import Master
+from core.schemas import MasterInfo, MasterDB, MasterBlockInfo, MasterBlockDB
+from db.models import Master, MasterBlock
 from db.postgresql import get_session
 from db.queries import select_all, select_one, insert_one
 
@@ -37,9 +39,9 @@ async def add_new_master(
         session=session,
         model=Master,
         schema=master,
-        exists_filter={'phone': master.phone},
         error_msg='Master with this phone already exists'
     )
+    catalog_cache.bump()
     return MasterDB.model_validate(new_master, from_attributes=True)
 
 
@@ -73,6 +75,7 @@ async def update_service(
     
     model_info = MasterDB.model_validate(updated_master, from_attributes=True)
     await session.commit()
+    catalog_cache.bump()
     
     return model_info
 
@@ -103,3 +106,81 @@ async def update_service(
     # Удаляем мастера
     await session.delete(existing_master)
     await session.commit()
+    catalog_cache.bump()
+    blocks_cache.bump()
+
+
+@masters_router.get('/{master_id}/blocks/', response_model=list[MasterBlockDB])
+async def get_master_blocks(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    master_id: Annotated[int, Path()]
+):
+    """Получение регулярных блокировок времени мастера"""
+    blocks = await get_masters_blocks(session)
+    return blocks.get(master_id, [])
+
+
+@masters_router.post(
+    '/{master_id}/blocks/',
+    response_model=MasterBlockDB,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(verify_token)]
+)
+async def add_master_block(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    master_id: Annotated[int, Path()],
+    block: Annotated[MasterBlockInfo, Body()]
+):
+    """Добавление регулярной блокировки времени мастера"""
+    # Блокировка закрывает ячейки сетки целиком, поэтому её границы в рабочее
+    # время должны совпадать с границами ячеек (иначе скрылось бы лишнее время)
+    if not (
+        is_block_time_on_grid(block.start_time)
+        and is_block_time_on_grid(block.end_time)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Block time must be aligned to the slot grid'
+        )
+    existing_master = await select_one(session, Master, {'id': master_id})
+    if existing_master is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Master not found'
+        )
+
+    result = await session.execute(
+        insert(MasterBlock)
+        .values(master_id=master_id, **block.model_dump())
+        .returning(MasterBlock)
+    )
+    model_info = MasterBlockDB.model_validate(result.scalar_one())
+    await session.commit()
+    blocks_cache.bump()
+
+    return model_info
+
+
+@masters_router.delete(
+    '/{master_id}/blocks/{block_id}/',
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(verify_token)]
+)
+async def delete_master_block(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    master_id: Annotated[int, Path()],
+    block_id: Annotated[int, Path()]
+):
+    """Удаление регулярной блокировки времени мастера"""
+    result = await session.execute(
+        delete(MasterBlock)
+        .where(MasterBlock.id == block_id, MasterBlock.master_id == master_id)
+        .returning(MasterBlock.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Block not found'
+        )
+    await session.commit()
+    blocks_cache.bump()
@@ -4,6 +4,7 @@ from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
+from api.catalog import catalog_cache
 from core.auth import verify_token
 from core.schemas import OfferingCreate, OfferingGet, MasterDB, ServiceDB
 from db.models import Offering, Master, Service
@@ -62,24 +63,21 @@ async def create_new_offering(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Service with such id doesn\'t exist'
         )
+    master_info = MasterDB.model_validate(master)
+    service_info = ServiceDB.model_validate(service)
     # Добавляем новую запись в БД
     new_offering = await insert_one(
         session=session,
         model=Offering,
         schema=offering,
-        exists_filter={
-            'master_id': offering.master_id,
-            'service_id': offering.service_id
-        },
         error_msg='The master already has such a service'
     )
-    await session.refresh(master)
-    await session.refresh(service)
+    catalog_cache.bump()
 
     return {
         'id': new_offering.id,
-        'master': MasterDB.model_validate(master),
-        'service': ServiceDB.model_validate(service),
+        'master': master_info,
+        'service': service_info,
         'price': new_offering.price,
         'duration': new_offering.duration
     }
@@ -129,6 +127,7 @@ async def update_service(
         setattr(existing_offering, field, value)
 
     await session.commit()
+    catalog_cache.bump()
     await session.refresh(existing_offering)
     await session.refresh(master)
     await session.refresh(service)
@@ -168,3 +167,4 @@ async def update_service(
     # Удаляем услугу мастера
     await session.delete(existing_offering)
     await session.commit()
+    catalog_cache.bump()
@@ -8,4 +8,9 @@ class slots:
     END_HOURS = 20
     END_MINUTES = 0
     SLOTS_DAYS = 7
+    # Насколько дней вперёд можно запрашивать слоты и записываться
+    BOOKING_DAYS = 60
     INTERVAL_MINUTES = 30
+    # Кэш занятости мастеров по дням
+    CACHE_SIZE = 4096
+    CACHE_TTL_SECONDS = 60
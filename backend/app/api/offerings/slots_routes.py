@@ -1,51 +1,93 @@
-from datetime import datetime
-from fastapi import APIRouter, status, Path, Depends, HTTPException
-from sqlalchemy import select
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, status, Path, Query, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
-from db.models import Offering, Occupation
+from api.catalog import get_offering
+from core.auth import verify_token
+from core.schemas import CacheStats
 from db.postgresql import get_session
-from db.queries import select_one
-from .utils import generate_time_slots_for_now, filter_busy_slots
+from .config import slots
+from .utils import availability_cache, stream_free_slots
 
 
 slots_router = APIRouter()
 
 
+@slots_router.get(
+    '/slots/cache/',
+    response_model=CacheStats,
+    dependencies=[Depends(verify_token)]
+)
+async def get_slots_cache_stats():
+    """Получение статистики кэша занятости мастеров"""
+    return availability_cache.stats()
+
+
 @slots_router.get(
     '/{offering_id}/slots/',
     response_model=list[datetime]
 )
 async def get_free_time_for_two_weeks(
     session: Annotated[AsyncSession, Depends(get_session)],
-    offering_id: Annotated[int, Path()]
+    response: Response,
+    offering_id: Annotated[int, Path()],
+    date_from: Annotated[date | None, Query(alias='from')] = None,
+    date_to: Annotated[date | None, Query(alias='to')] = None,
+    cursor: Annotated[datetime | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000)] = None
 ):
-    """Получение всех ячеек записи на определённое время вперёд"""
-    # Получаем услугу мастера из БД
-    offering = await select_one(session, Offering, {'id': offering_id})
+    """Получение свободных ячеек записи за период (по-умолчанию - на неделю вперёд).
+
+    Период задаётся датами ``from`` и ``to`` (включительно). При указании
+    ``limit`` отдаётся не больше ``limit`` слотов, а если слоты остались,
+    в заголовке ``X-Next-Cursor`` передаётся курсор для следующей страницы.
+    """
+    # Получаем услугу мастера из каталога
+    offering = await get_offering(session, offering_id)
     if offering is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Offering with such id doesn\'t exist'
         )
-    # Генерируем слоты для записи без учёта занятости мастера
-    slots = generate_time_slots_for_now(
-        offering.duration.hour,
-        offering.duration.minute
-    )
-    # Получаем из БД всё несвободное время мастера
-    result = await session.execute(
-        select(Occupation).where(Occupation.master_id == offering.master_id)
-    )
-    occupations = result.scalars().all()
-    busy_intervals = [(el.start, el.end) for el in occupations]
-    # Фильтруем слоты и получаем все свободные
-    free_slots = filter_busy_slots(
-        slots,
-        busy_intervals,
-        offering.duration.hour,
-        offering.duration.minute
-    )
+    # Слоты - местное время салона без часового пояса (как и при записи)
+    if cursor is not None and cursor.tzinfo is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Cursor must not contain a time zone'
+        )
+    # Дни запрашиваемого периода в пределах горизонта записи
+    today = date.today()
+    date_from = date_from or today
+    date_to = date_to or date_from + timedelta(days=slots.SLOTS_DAYS - 1)
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Date range is incorrect'
+        )
+    first_day = max(date_from, today, cursor.date() if cursor else today)
+    last_day = min(date_to, today + timedelta(days=slots.BOOKING_DAYS - 1))
+    days = [
+        first_day + timedelta(days=day)
+        for day in range((last_day - first_day).days + 1)
+    ]
+    # Свободные слоты генерируются по дням, пока их не наберётся достаточно
+    free_slots = []
+    async for slot in stream_free_slots(
+        session,
+        offering.master.id,
+        timedelta(
+            hours=offering.duration.hour,
+            minutes=offering.duration.minute
+        ),
+        days,
+        after=cursor,
+        # Без ограничения занятость за весь период загружается одним запросом
+        batch_days=1 if limit is not None else max(len(days), 1)
+    ):
+        if limit is not None and len(free_slots) == limit:
+            response.headers['X-Next-Cursor'] = free_slots[-1].isoformat()
+            break
+        free_slots.append(slot)
 
     return free_slots
@@ -1,71 +1,363 @@
+import math
 from datetime import date, datetime, time, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Iterable, Iterator
 
+from core.cache import LRUCache, VersionedCache
+from core.schemas import MasterBlockDB
+from db.models import MasterBlock
+from db.queries import select_all, select_busy_intervals
 from .config import slots
 
 
-def generate_time_slots_for_now(duration_h: int, duration_m: int) -> list[datetime]:
-    """Генерация всех слотов для услуги мастера, начиная с текущего времени."""
-    time_slots = []
-    today = date.today()
+# Занятость мастеров по дням: (master_id, день) -> битовая маска ячеек
+availability_cache: LRUCache[tuple[int, date], int] = LRUCache(
+    max_size=slots.CACHE_SIZE,
+    ttl=slots.CACHE_TTL_SECONDS
+)
+# Правила регулярных блокировок: master_id -> список правил
+# (сбрасывается при любом изменении правил, а изменения других процессов
+# подхватываются по истечении времени жизни, как и у занятости)
+blocks_cache: VersionedCache[dict[int, list[MasterBlockDB]]] = VersionedCache(
+    ttl=slots.CACHE_TTL_SECONDS
+)
+
+
+# Сетка дня: ячейки по INTERVAL_MINUTES от START до END
+CELL = timedelta(minutes=slots.INTERVAL_MINUTES)
+DAY_LENGTH = timedelta(
+    hours=slots.END_HOURS - slots.START_HOURS,
+    minutes=slots.END_MINUTES - slots.START_MINUTES
+)
+CELLS_PER_DAY = DAY_LENGTH // CELL
+FULL_DAY_MASK = (1 << CELLS_PER_DAY) - 1
+
+
+def _day_origin(day: date) -> datetime:
+    """Начало первой ячейки дня"""
+    return datetime.combine(day, time(slots.START_HOURS, slots.START_MINUTES))
+
+
+def _day_slot_cells(day: date, duration: timedelta, now: datetime) -> range:
+    """Номера ячеек дня, с которых можно начать услугу длительностью duration"""
+    first_cell = 0
+    if day == now.date():
+        # Не раньше текущего момента (округлённого вниз до начала ячейки)
+        first_cell = max(0, (now - _day_origin(day)) // CELL)
+    last_cell = (DAY_LENGTH - duration) // CELL
+    return range(first_cell, last_cell + 1)
+
+
+def get_slot_days(today: date | None = None) -> list[date]:
+    """Дни, на которые генерируются слоты, начиная с сегодняшнего"""
+    today = today or date.today()
+    return [today + timedelta(days=day) for day in range(slots.SLOTS_DAYS)]
+
+
+def generate_day_slots(
+    day: date,
+    duration: timedelta,
+    now: datetime | None = None
+) -> Iterator[datetime]:
+    """Генерация слотов одного дня для услуги заданной длительности (лениво)"""
+    now = now or datetime.now()
+    origin = _day_origin(day)
+    for cell in _day_slot_cells(day, duration, now):
+        yield origin + cell * CELL
+
+
+def generate_time_slots_for_now(duration_h: int, duration_m: int) -> Iterator[datetime]:
+    """Генерация всех слотов для услуги мастера, начиная с текущего времени.
+
+    Слоты генерируются лениво, по возрастанию.
+    """
     now = datetime.now()  # Текущие дата и время
-    
-    for day in range(slots.SLOTS_DAYS):
-        current_date = today + timedelta(days=day)
-        
-        # Начальное время для дня (но не раньше текущего момента)
-        day_start = datetime.combine(
-            current_date, 
-            time(slots.START_HOURS, slots.START_MINUTES)
+    duration = timedelta(hours=duration_h, minutes=duration_m)
+    for day in get_slot_days(now.date()):
+        yield from generate_day_slots(day, duration, now)
+
+
+def is_slot_on_grid(slot: datetime, duration_h: int, duration_m: int) -> bool:
+    """Проверка за O(1), что слот лежит на сетке в пределах горизонта записи"""
+    now = datetime.now()
+    if slot.tzinfo is not None:
+        return False
+    if not 0 <= (slot.date() - now.date()).days < slots.BOOKING_DAYS:
+        return False
+    cell, remainder = divmod(slot - _day_origin(slot.date()), CELL)
+    duration = timedelta(hours=duration_h, minutes=duration_m)
+    return not remainder and cell in _day_slot_cells(slot.date(), duration, now)
+
+
+def _days_between(start: datetime, end: datetime) -> list[date]:
+    """Все дни, которые задевает интервал [start, end)"""
+    last_day = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    return [
+        start.date() + timedelta(days=offset)
+        for offset in range((last_day - start.date()).days + 1)
+    ]
+
+
+def occupancy_mask(day: date, busy_start: datetime, busy_end: datetime) -> int:
+    """Битовая маска ячеек дня, которые задевает занятый интервал"""
+    origin = _day_origin(day)
+    start_cell = max(0, math.floor((busy_start - origin) / CELL))
+    end_cell = min(CELLS_PER_DAY, math.ceil((busy_end - origin) / CELL))
+    if end_cell <= start_cell:
+        return 0
+    return ((1 << (end_cell - start_cell)) - 1) << start_cell
+
+
+def free_starts_mask(busy_mask: int, offering_duration: timedelta) -> int:
+    """Битовая маска ячеек, с которых услуга помещается в свободное время.
+
+    Бит i установлен, если свободны все ячейки, которые задевает услуга,
+    начатая в ячейке i (и она заканчивается не позже конца дня).
+    """
+    cells = max(1, math.ceil(offering_duration / CELL))
+    free = ~busy_mask & FULL_DAY_MASK
+    fits = free
+    for shift in range(1, cells):
+        fits &= free >> shift
+    return fits
+
+
+def iter_free_slots(
+    slots: Iterable[datetime],
+    occupancy: dict[date, int],
+    offering_duration: timedelta
+) -> Iterator[datetime]:
+    """Ленивый отбор свободных слотов по битовым маскам занятости мастера"""
+    free_masks: dict[date, int] = {}
+    for slot in slots:
+        day = slot.date()
+        if day not in free_masks:
+            free_masks[day] = free_starts_mask(occupancy[day], offering_duration)
+        if free_masks[day] >> ((slot - _day_origin(day)) // CELL) & 1:
+            yield slot
+
+
+def iter_day_free_slots(
+    day: date,
+    busy_mask: int,
+    offering_duration: timedelta,
+    now: datetime | None = None
+) -> Iterator[datetime]:
+    """Ленивые свободные слоты одного дня по маске занятости мастера"""
+    return iter_free_slots(
+        generate_day_slots(day, offering_duration, now),
+        {day: busy_mask},
+        offering_duration
+    )
+
+
+def bundle_offsets(durations: Iterable[timedelta]) -> list[timedelta]:
+    """Сдвиги начала каждой услуги цепочки относительно начала первой.
+
+    Услуги идут подряд: следующая начинается с первой ячейки сетки после
+    окончания предыдущей.
+    """
+    offsets, offset = [], timedelta()
+    for duration in durations:
+        offsets.append(offset)
+        offset += max(1, math.ceil(duration / CELL)) * CELL
+    return offsets
+
+
+def iter_day_bundle_slots(
+    day: date,
+    busy_masks: list[int],
+    durations: list[timedelta],
+    now: datetime | None = None
+) -> Iterator[datetime]:
+    """Ленивые начала цепочки услуг одного дня.
+
+    Маски допустимых начал каждой услуги сдвигаются на её смещение в цепочке
+    и пересекаются побитовым И - остаются начала, при которых все услуги
+    помещаются в свободное время своих мастеров.
+    """
+    offsets = bundle_offsets(durations)
+    joint = FULL_DAY_MASK
+    for busy_mask, duration, offset in zip(busy_masks, durations, offsets):
+        joint &= free_starts_mask(busy_mask, duration) >> (offset // CELL)
+    now = now or datetime.now()
+    origin = _day_origin(day)
+    for cell in _day_slot_cells(day, offsets[-1] + durations[-1], now):
+        if joint >> cell & 1:
+            yield origin + cell * CELL
+
+
+def filter_occupied_slots(
+    slots: Iterable[datetime],
+    occupancy: dict[date, int],
+    offering_duration: timedelta
+) -> list[datetime]:
+    """Удаление слотов по битовым маскам занятости мастера"""
+    return list(iter_free_slots(slots, occupancy, offering_duration))
+
+
+async def get_masters_blocks(session: AsyncSession) -> dict[int, list[MasterBlockDB]]:
+    """Получение правил регулярных блокировок всех мастеров (с кэшированием)"""
+    blocks = blocks_cache.get()
+    if blocks is not None:
+        return blocks
+    version = blocks_cache.version
+    blocks = {}
+    for block in await select_all(session, MasterBlock):
+        blocks.setdefault(block.master_id, []).append(
+            MasterBlockDB.model_validate(block)
+        )
+    blocks_cache.set(blocks, version)
+    return blocks
+
+
+def is_block_time_on_grid(value: time) -> bool:
+    """Проверка, что граница блокировки не делит ячейку сетки
+    (вне рабочего дня граница может быть любой)"""
+    offset = datetime.combine(date.min, value) - _day_origin(date.min)
+    return offset <= timedelta(0) or offset >= DAY_LENGTH or not offset % CELL
+
+
+def blocks_mask(blocks: Iterable[MasterBlockDB], day: date) -> int:
+    """Битовая маска ячеек дня, которые задевают действующие в этот день правила"""
+    mask = 0
+    for block in blocks:
+        if block.weekday != day.weekday():
+            continue
+        if block.valid_from is not None and day < block.valid_from:
+            continue
+        if block.valid_to is not None and day > block.valid_to:
+            continue
+        mask |= occupancy_mask(
+            day,
+            datetime.combine(day, block.start_time),
+            datetime.combine(day, block.end_time)
         )
-        if day == 0:
-            current_minute = now.minute
-            rounded_minute = (current_minute // slots.INTERVAL_MINUTES) * slots.INTERVAL_MINUTES
-            now = now.replace(minute=rounded_minute, second=0, microsecond=0)
-            day_start = max(day_start, now)
-        
-        # Конечное время с учётом длительности услуги
-        day_end = datetime.combine(
-            current_date,
-            time(slots.END_HOURS, slots.END_MINUTES)
-        ) - timedelta(hours=duration_h, minutes=duration_m)
-        
-        # Генерация слотов
-        current_slot = day_start
-        while current_slot <= day_end:
-            time_slots.append(current_slot)
-            current_slot += timedelta(minutes=slots.INTERVAL_MINUTES)
-    
-    return time_slots
-
-
-def is_slot_busy(
+    return mask
+
+
+def is_slot_blocked(
+    blocks: Iterable[MasterBlockDB],
     slot: datetime,
-    busy_intervals: list[tuple[datetime, datetime]],
     offering_duration: timedelta
 ) -> bool:
-    """Проверка слота в зависимости от занятости мастера"""
-    for busy_start, busy_end in busy_intervals:
-        # Проверяем, попадает ли слот в занятый интервал
-        if busy_start - offering_duration < slot < busy_end:
-            return True
-    return False
-
-
-def filter_busy_slots(
-    slots: list[datetime],
-    busy_intervals: list[tuple[datetime, datetime]],
-    offering_duration_h: int,
-    offering_duration_m: int
-) -> list[datetime]:
-    """Удаление слотов в зависимости от занятости мастера"""
-    filtered_slots = []
-    offering_duration = timedelta(
-        hours=offering_duration_h,
-        minutes=offering_duration_m
+    """Проверка, задевает ли услуга, начатая в slot, заблокированное время
+    (по той же маске ячеек, что и при выдаче свободных слотов)"""
+    day = slot.date()
+    free = free_starts_mask(blocks_mask(blocks, day), offering_duration)
+    return not free >> ((slot - _day_origin(day)) // CELL) & 1
+
+
+async def get_masters_occupancy(
+    session: AsyncSession,
+    master_ids: Iterable[int],
+    days: Iterable[date]
+) -> dict[int, dict[date, int]]:
+    """Получение масок занятости нескольких мастеров по дням (с кэшированием).
+
+    Всё, чего нет в кэше, загружается из БД одним запросом. К занятости
+    добавляются регулярные блокировки мастера - правила разворачиваются только
+    для запрошенных дней и в кэш занятости не попадают.
+    """
+    days = sorted(set(days))
+    blocks = await get_masters_blocks(session)
+    occupancy = await _get_occupations_masks(session, master_ids, days)
+    for master_id, masks in occupancy.items():
+        master_blocks = blocks.get(master_id)
+        if master_blocks:
+            for day in days:
+                masks[day] |= blocks_mask(master_blocks, day)
+    return occupancy
+
+
+async def _get_occupations_masks(
+    session: AsyncSession,
+    master_ids: Iterable[int],
+    days: list[date]
+) -> dict[int, dict[date, int]]:
+    """Маски реальной занятости мастеров по дням (из кэша или одним запросом)"""
+    occupancy: dict[int, dict[date, int]] = {}
+    missing: list[tuple[int, date]] = []
+    for master_id in set(master_ids):
+        occupancy[master_id] = {}
+        for day in days:
+            busy_mask = availability_cache.get((master_id, day))
+            if busy_mask is None:
+                missing.append((master_id, day))
+            else:
+                occupancy[master_id][day] = busy_mask
+    if not missing:
+        return occupancy
+
+    version = availability_cache.version
+    missing_days = sorted({day for _, day in missing})
+    loaded = await select_busy_intervals(
+        session,
+        sorted({master_id for master_id, _ in missing}),
+        datetime.combine(missing_days[0], time()),
+        datetime.combine(missing_days[-1] + timedelta(days=1), time())
     )
-    
-    for slot in slots:
-        if not is_slot_busy(slot, busy_intervals, offering_duration):
-            filtered_slots.append(slot)
-    
-    return filtered_slots
+    loaded_occupancy = dict.fromkeys(missing, 0)
+    for master_id, busy_start, busy_end in loaded:
+        for day in _days_between(busy_start, busy_end):
+            if (master_id, day) in loaded_occupancy:
+                loaded_occupancy[(master_id, day)] |= occupancy_mask(
+                    day, busy_start, busy_end
+                )
+    for (master_id, day), busy_mask in loaded_occupancy.items():
+        availability_cache.set((master_id, day), busy_mask, version)
+        occupancy[master_id][day] = busy_mask
+    return occupancy
+
+
+async def get_day_occupancy(
+    session: AsyncSession,
+    master_id: int,
+    days: Iterable[date]
+) -> dict[date, int]:
+    """Получение масок занятости мастера по дням (с кэшированием)"""
+    occupancy = await get_masters_occupancy(session, [master_id], days)
+    return occupancy[master_id]
+
+
+async def stream_free_slots(
+    session: AsyncSession,
+    master_id: int,
+    offering_duration: timedelta,
+    days: list[date],
+    after: datetime | None = None,
+    batch_days: int = 1
+) -> AsyncIterator[datetime]:
+    """Потоковая генерация свободных слотов мастера по дням.
+
+    Занятость загружается порциями по ``batch_days`` дней и только тогда,
+    когда до них доходит потребитель. ``after`` - отдавать только слоты позже.
+    """
+    now = datetime.now()
+    for index in range(0, len(days), batch_days):
+        batch = days[index:index + batch_days]
+        occupancy = await get_day_occupancy(session, master_id, batch)
+        for day in batch:
+            for slot in iter_day_free_slots(day, occupancy[day], offering_duration, now):
+                if after is None or slot > after:
+                    yield slot
+
+
+def update_occupancy(
+    master_id: int,
+    busy_start: datetime,
+    busy_end: datetime,
+    occupied: bool
+) -> None:
+    """Инкрементальное изменение закэшированной занятости мастера.
+
+    Занятые интервалы мастера не пересекаются (ограничение в БД) и начинаются
+    на сетке слотов, поэтому у двух интервалов нет общих ячеек и освобождение
+    ячеек одного интервала не затрагивает другие.
+    """
+    for day in _days_between(busy_start, busy_end):
+        mask = occupancy_mask(day, busy_start, busy_end)
+        if occupied:
+            availability_cache.update((master_id, day), lambda busy: busy | mask)
+        else:
+            availability_cache.update((master_id, day), lambda busy: busy & ~mask)
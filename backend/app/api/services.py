@@ -1,10 +1,24 @@
-from fastapi import APIRouter, status, Body, Depends, Path, HTTPException
+import heapq
+from datetime import datetime, timedelta
+from itertools import repeat
+from operator import itemgetter
+from fastapi import APIRouter, status, Body, Depends, Path, Query, HTTPException
 from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
+from api.catalog import catalog_cache, get_catalog
+from api.offerings.utils import (
+    generate_time_slots_for_now,
+    filter_occupied_slots,
+    get_masters_occupancy,
+    get_slot_days,
+    iter_day_free_slots
+)
 from core.auth import verify_token
-from core.schemas import ServiceInfo, ServiceDB
+from core.schemas import (
+    ServiceInfo, ServiceDB, ServiceAvailability, AvailableSlot
+)
 from db.models import Service
 from db.postgresql import get_session
 from db.queries import select_all, select_one, insert_one
@@ -22,6 +36,123 @@ async def get_all_services(
     return result
 
 
+@services_router.get(
+    '/{service_id}/availability/',
+    response_model=ServiceAvailability
+)
+async def get_service_availability(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    service_id: Annotated[int, Path()]
+):
+    """Получение свободного времени всех мастеров, оказывающих услугу"""
+    # Получаем услугу и всех мастеров с ней из каталога
+    catalog = (await get_catalog(session)).catalog
+    service = next((el for el in catalog.services if el.id == service_id), None)
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Service not found'
+        )
+    offerings = [el for el in catalog.offerings if el.service.id == service_id]
+    # Получаем занятость всех мастеров одним запросом
+    occupancy = await get_masters_occupancy(
+        session,
+        [offering.master.id for offering in offerings],
+        get_slot_days()
+    )
+    # Свободные слоты каждого мастера
+    free_slots = [
+        set(filter_occupied_slots(
+            generate_time_slots_for_now(
+                offering.duration.hour,
+                offering.duration.minute
+            ),
+            occupancy[offering.master.id],
+            timedelta(
+                hours=offering.duration.hour,
+                minutes=offering.duration.minute
+            )
+        ))
+        for offering in offerings
+    ]
+    # Матрица: слоты, в которые свободен хотя бы один мастер
+    slots = sorted(set().union(*free_slots))
+    return {
+        'service': service,
+        'slots': slots,
+        'masters': [
+            {
+                'offering_id': offering.id,
+                'master': offering.master,
+                'price': offering.price,
+                'duration': offering.duration,
+                'free': [slot in master_slots for slot in slots]
+            }
+            for offering, master_slots in zip(offerings, free_slots)
+        ]
+    }
+
+
+@services_router.get(
+    '/{service_id}/next-available/',
+    response_model=list[AvailableSlot]
+)
+async def get_next_available_slots(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    service_id: Annotated[int, Path()],
+    limit: Annotated[int, Query(ge=1, le=100)] = 10
+):
+    """Получение ближайшего свободного времени для услуги у любого мастера"""
+    catalog = (await get_catalog(session)).catalog
+    if not any(el.id == service_id for el in catalog.services):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Service not found'
+        )
+    offerings = [el for el in catalog.offerings if el.service.id == service_id]
+
+    result = []
+    now = datetime.now()
+    # Дни перебираются по порядку: занятость следующего дня загружается,
+    # только если предыдущих не хватило
+    for day in get_slot_days(now.date()):
+        occupancy = await get_masters_occupancy(
+            session,
+            [offering.master.id for offering in offerings],
+            [day]
+        )
+        # Слияние свободных слотов всех мастеров по времени
+        merged = heapq.merge(
+            *(
+                zip(
+                    iter_day_free_slots(
+                        day,
+                        occupancy[offering.master.id][day],
+                        timedelta(
+                            hours=offering.duration.hour,
+                            minutes=offering.duration.minute
+                        ),
+                        now
+                    ),
+                    repeat(offering)
+                )
+                for offering in offerings
+            ),
+            key=itemgetter(0)
+        )
+        for slot, offering in merged:
+            result.append({
+                'datetime': slot,
+                'offering_id': offering.id,
+                'master': offering.master,
+                'price': offering.price,
+                'duration': offering.duration
+            })
+            if len(result) == limit:
+                return result
+    return result
+
+
 @services_router.post(
     '/',
     response_model=ServiceDB,
@@ -37,9 +168,9 @@ async def add_new_service(
         session=session,
         model=Service,
         schema=service,
-        exists_filter={'name': service.name},
         error_msg='Service with this name already exists'
     )
+    catalog_cache.bump()
     return ServiceDB.model_validate(new_service, from_attributes=True)
 
 
@@ -73,6 +204,7 @@ async def update_service(
     
     model_info = ServiceDB.model_validate(updated_service, from_attributes=True)
     await session.commit()
+    catalog_cache.bump()
     
     return model_info
 
@@ -103,3 +235,4 @@ async def update_service(
     # Удаляем услугу
     await session.delete(existing_service)
     await session.commit()
+    catalog_cache.bump()
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated
+
+from api.catalog import get_catalog
+from core.auth import verify_token
+from core.schemas import StatsGet
+from db.models import Stats
+from db.postgresql import get_session
+
+
+stats_router = APIRouter(prefix='/stats')
+
+
+@stats_router.get(
+    '/',
+    response_model=StatsGet,
+    dependencies=[Depends(verify_token)]
+)
+async def get_stats(
+    session: Annotated[AsyncSession, Depends(get_session)]
+):
+    """Получение статистики для панели администратора"""
+    # Счётчики записей и клиентов поддерживаются триггерами в БД
+    # (сумма по шардам - несколько строк одной таблицы)
+    stats = (await session.execute(
+        select(
+            func.coalesce(func.sum(Stats.appointments), 0).label('appointments'),
+            func.coalesce(
+                func.sum(Stats.confirmed_appointments), 0
+            ).label('confirmed_appointments'),
+            func.coalesce(func.sum(Stats.customers), 0).label('customers')
+        )
+    )).one()
+    # Услуги и мастера - из снимка каталога
+    catalog = (await get_catalog(session)).catalog
+    return {
+        'total_appointments': stats.appointments,
+        'confirmed_appointments': stats.confirmed_appointments,
+        'pending_appointments': stats.appointments - stats.confirmed_appointments,
+        'total_customers': stats.customers,
+        'total_services': len(catalog.services),
+        'total_masters': len(catalog.masters)
+    }
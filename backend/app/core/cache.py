@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Generic, Hashable, TypeVar
+
+
+T = TypeVar('T')
+K = TypeVar('K', bound=Hashable)
+
+
+class VersionedCache(Generic[T]):
+    """Кэш одного значения, действительного до смены версии данных.
+
+    Версия хранится в процессе и повышается только его собственными
+    изменениями, поэтому ``ttl`` ограничивает, как долго процесс может
+    отдавать значение, устаревшее из-за изменений в других процессах.
+    """
+
+    def __init__(self, ttl: float | None = None):
+        self.ttl = ttl
+        self.version = 0
+        self._value: T | None = None
+        self._value_version: int | None = None
+        self._expires_at = 0.0
+
+    def bump(self) -> None:
+        """Отметка об изменении данных (текущее значение устаревает)"""
+        self.version += 1
+
+    def get(self) -> T | None:
+        """Получение значения, если оно построено для текущей версии и не устарело"""
+        if self._value_version != self.version:
+            return None
+        if self.ttl is not None and self._expires_at <= monotonic():
+            return None
+        return self._value
+
+    def set(self, value: T, version: int) -> None:
+        """Сохранение значения, построенного для версии ``version``"""
+        # Данные могли измениться, пока значение строилось
+        if version == self.version:
+            self._value = value
+            self._value_version = version
+            if self.ttl is not None:
+                self._expires_at = monotonic() + self.ttl
+
+
+class LRUCache(Generic[K, T]):
+    """Ограниченный по размеру LRU-кэш с временем жизни записей"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Повышается при каждой инвалидации, см. ``set``
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, T]] = OrderedDict()
+
+    def get(self, key: K) -> T | None:
+        """Получение значения по ключу (``None``, если его нет или оно устарело)"""
+        item = self._data.get(key)
+        if item is None or item[0] <= monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: K, value: T, version: int | None = None) -> None:
+        """Сохранение значения по ключу.
+
+        ``version`` - значение ``self.version`` на момент начала построения
+        значения: если за это время была инвалидация, значение не сохраняется.
+        """
+        if version is not None and version != self.version:
+            return
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def update(self, key: K, func: Callable[[T], T]) -> None:
+        """Изменение значения на месте, если оно есть в кэше"""
+        self.version += 1
+        item = self._data.get(key)
+        if item is not None:
+            self._data[key] = (item[0], func(item[1]))
+
+    def invalidate(self, key: K) -> None:
+        """Удаление значения по ключу"""
+        self.version += 1
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Удаление всех значений"""
+        self.version += 1
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """Статистика использования кэша"""
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
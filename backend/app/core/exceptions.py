@@ -2,11 +2,15 @@ import logging
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATE нарушений ограничений целостности в PostgreSQL
+UNIQUE_VIOLATION = '23505'
+EXCLUSION_VIOLATION = '23P01'
+
 
 def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     """Обработчик всех ошибок SQLAlchemy"""
@@ -19,6 +23,28 @@ def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     )
 
 
+def integrity_exception_handler(request: Request, exc: IntegrityError):
+    """Обработчик нарушений ограничений целостности"""
+    pgcode = getattr(exc.orig, 'pgcode', None)
+    # Пересечение занятого времени мастера (ограничение на occupations)
+    if pgcode == EXCLUSION_VIOLATION:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={
+                'error': 'This time is not available now'
+            },
+        )
+    # Нарушение уникальности (например, при изменении объекта)
+    if pgcode == UNIQUE_VIOLATION:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={
+                'error': 'This object already exists'
+            },
+        )
+    return sqlalchemy_exception_handler(request, exc)
+
+
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Обработчик всех ошибок валидации pydantic"""
     return JSONResponse(
@@ -56,5 +82,6 @@ async def generic_exception_handler(request: Request, exc: Exception):
 def register_exception_handlers(app: FastAPI) -> None:
     """Функция для регистрации всех обработчиков ошибок"""
     app.exception_handler(SQLAlchemyError)(sqlalchemy_exception_handler)
+    app.exception_handler(IntegrityError)(integrity_exception_handler)
     app.exception_handler(RequestValidationError)(validation_exception_handler)
     app.exception_handler(Exception)(generic_exception_handler)
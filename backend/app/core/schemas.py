@@ -1,9 +1,24 @@
-from datetime import datetime, time
-from pydantic import BaseModel, Field
+from datetime import date, datetime, time
+from pydantic import AfterValidator, BaseModel, Field, model_validator
 from typing import Annotated
 
+from .utils import normalize_phone
+
+
+# Минимальное число цифр в номере телефона клиента (клиенты различаются
+# по номеру из одних цифр, поэтому номер без цифр объединил бы всех)
+MIN_PHONE_DIGITS = 7
+
+
+def check_phone_digits(phone: str) -> str:
+    """Проверка, что в номере телефона достаточно цифр"""
+    if len(normalize_phone(phone)) < MIN_PHONE_DIGITS:
+        raise ValueError(f'Phone number must contain at least {MIN_PHONE_DIGITS} digits')
+    return phone
+
 
 phone_str = Annotated[str, Field(min_length=2, max_length=20)]
+customer_phone_str = Annotated[phone_str, AfterValidator(check_phone_digits)]
 name_str = Annotated[str, Field(min_length=2, max_length=100)]
 id_int = Annotated[int, Field(gt=0)]
 price_type = Annotated[int, Field(ge=0)]
@@ -40,6 +55,37 @@ class MasterDB(MasterInfo):
         from_attributes = True
 
 
+class MasterBlockInfo(BaseModel):
+    """Модель с правилом регулярной блокировки времени мастера
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    weekday: Annotated[int, Field(ge=0, le=6)]
+    start_time: time
+    end_time: time
+    valid_from: date | None = None
+    valid_to: date | None = None
+
+    @model_validator(mode='after')
+    def check_ranges(self):
+        if self.end_time <= self.start_time:
+            raise ValueError('end_time must be later than start_time')
+        if (
+            self.valid_from is not None and self.valid_to is not None
+            and self.valid_to < self.valid_from
+        ):
+            raise ValueError('valid_to must not be earlier than valid_from')
+        return self
+
+
+class MasterBlockDB(MasterBlockInfo):
+    """Модель со всей информацией о блокировке времени мастера из базы данных
+    \n_(по-умолчанию используется верификация **модели**)_"""
+    id: id_int
+    master_id: id_int
+
+    class Config:
+        from_attributes = True
+
+
 class OfferingCreate(BaseModel):
     """Модель с основной информацией, используемой для создания услуги мастера
     \n_(по-умолчанию используется верификация **словаря**)_"""
@@ -78,6 +124,42 @@ class OfferingGet(OfferingGetMaster, OfferingGetService):
     pass
 
 
+class Catalog(BaseModel):
+    """Модель каталога салона: услуги, мастера и услуги мастеров с ценами
+    \n_(по-умолчанию используется верификация **модели**)_"""
+    services: list[ServiceDB]
+    masters: list[MasterDB]
+    offerings: list[OfferingGet]
+
+
+class MasterAvailability(BaseModel):
+    """Модель со свободным временем мастера для одной услуги
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    offering_id: id_int
+    master: MasterDB
+    price: price_type
+    duration: time
+    free: list[bool]
+
+
+class ServiceAvailability(BaseModel):
+    """Модель с матрицей свободного времени (мастер x слот) для услуги
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    service: ServiceDB
+    slots: list[datetime]
+    masters: list[MasterAvailability]
+
+
+class AvailableSlot(BaseModel):
+    """Модель со свободным временем у конкретного мастера
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    datetime: datetime
+    offering_id: id_int
+    master: MasterDB
+    price: price_type
+    duration: time
+
+
 class TimeSlot(BaseModel):
     """Модель с информацией о временном слоте
     \n_(по-умолчанию используется верификация **словаря**)_"""
@@ -89,11 +171,27 @@ class AppointmentCreate(BaseModel):
     """Модель с основной информацией, используемой для создания записи
     \n_(по-умолчанию используется верификация **словаря**)_"""
     name: name_str
-    phone: phone_str
+    phone: customer_phone_str
     offering_id: id_int
     datetime: datetime
 
 
+class BundleCreate(BaseModel):
+    """Модель с информацией для записи на несколько услуг подряд
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    name: name_str
+    phone: customer_phone_str
+    offering_ids: Annotated[list[id_int], Field(min_length=1, max_length=5)]
+    datetime: datetime
+
+
+class BundleSlot(BaseModel):
+    """Модель со временем начала цепочки услуг и слотами каждой из них
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    start: datetime
+    slots: list[TimeSlot]
+
+
 class AppointmentGet(BaseModel):
     """Модель со всей информацией о записи (кроме кода подтверждения)
     \n_(по-умолчанию используется верификация **модели**)_"""
@@ -103,6 +201,7 @@ class AppointmentGet(BaseModel):
     offering: OfferingGet
     slot: TimeSlot
     confirmed: bool
+    bundle_id: int | None = None
     created_at: datetime
 
     class Config:
@@ -123,6 +222,8 @@ class CustomerGet(BaseModel):
     name: name_str
     status: Annotated[str, Field(max_length=10)]
     created_at: datetime
+    visits_count: int
+    last_visit_at: datetime | None
 
 
 class CustomersStatusUpdate(BaseModel):
@@ -131,6 +232,26 @@ class CustomersStatusUpdate(BaseModel):
     status: Annotated[str, Field(max_length=10)]
 
 
+class StatsGet(BaseModel):
+    """Модель со статистикой для панели администратора
+    \n_(по-умолчанию используется верификация **словаря**)_"""
+    total_appointments: int
+    confirmed_appointments: int
+    pending_appointments: int
+    total_customers: int
+    total_services: int
+    total_masters: int
+
+
+class CacheStats(BaseModel):
+    """Модель со статистикой использования кэша"""
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+
+
 class OKModel(BaseModel):
     """Модель ответа для {"message": "OK"}"""
     message: Annotated[str, Field(default='OK')]
@@ -0,0 +1,11 @@
+import re
+
+
+def normalize_phone(phone: str) -> str:
+    """Приведение номера телефона к каноническому виду (только цифры)"""
+    return re.sub(r'[^0-9]', '', phone)
+
+
+def escape_like(value: str) -> str:
+    """Экранирование спецсимволов шаблона LIKE (экранирующий символ - ``\\``)"""
+    return re.sub(r'([\\%_])', r'\\\1', value)
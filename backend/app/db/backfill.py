@@ -0,0 +1,42 @@
+"""Разовый пересчёт агрегатов клиентов по существующим записям.
+
+Запуск из каталога backend/app: ``python -m db.backfill``. Нужен один раз
+для данных, созданных до появления триггера визитов (см. db.triggers).
+"""
+import asyncio
+from sqlalchemy import func, select, update
+
+from .models import Appointment, Customer, Occupation
+from .postgresql import create_tables, engine
+
+
+async def backfill_customer_visits() -> int:
+    """Пересчёт числа визитов и последнего визита у всех клиентов"""
+    visits = (
+        select(func.count(Appointment.id))
+        .where(Appointment.customer_id == Customer.id, Appointment.confirmed)
+        .scalar_subquery()
+    )
+    last_visit = (
+        select(func.max(Occupation.start))
+        .join(Appointment, Appointment.occupation_id == Occupation.id)
+        .where(Appointment.customer_id == Customer.id, Appointment.confirmed)
+        .scalar_subquery()
+    )
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            update(Customer).values(visits_count=visits, last_visit_at=last_visit)
+        )
+    return result.rowcount
+
+
+async def main():
+    # Таблицы, столбцы и триггеры должны существовать до пересчёта
+    await create_tables()
+    updated = await backfill_customer_visits()
+    print(f'Customers updated: {updated}')
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,5 +1,8 @@
-from datetime import datetime, time
-from sqlalchemy import String, ForeignKey, text
+from datetime import date, datetime, time
+from sqlalchemy import (
+    DDL, Computed, Sequence, String, ForeignKey, Index, UniqueConstraint, event, text
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSRANGE, ExcludeConstraint, Range
 from sqlalchemy.orm import (
     DeclarativeBase, Mapped, mapped_column, relationship
 )
@@ -15,14 +18,55 @@ class Base(DeclarativeBase):
     pass
 
 
+# Расширение для использования '=' по целым числам в GiST-ограничениях
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS btree_gist')
+)
+# Триграммы для быстрого поиска по подстроке и похожести
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+)
+
+
 class Customer(Base):
     __tablename__ = 'customers'
+    __table_args__ = (
+        # Постраничный вывод клиентов (в том числе с фильтром по статусу)
+        Index('ix_customers_created_at_id', 'created_at', 'id'),
+        Index('ix_customers_status_created_at_id', 'status', 'created_at', 'id'),
+        # Поиск клиентов по имени и номеру телефона
+        Index(
+            'ix_customers_name_trgm',
+            'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'}
+        ),
+        Index(
+            'ix_customers_phone_key_trgm',
+            'phone_key',
+            postgresql_using='gin',
+            postgresql_ops={'phone_key': 'gin_trgm_ops'}
+        ),
+    )
 
     id: Mapped[int_pk]
     phone: Mapped[str] = mapped_column(String(20))
+    # Номер телефона из одних цифр (см. core.utils.normalize_phone)
+    phone_key: Mapped[str] = mapped_column(
+        String(20),
+        Computed("regexp_replace(phone, '[^0-9]', '', 'g')", persisted=True),
+        unique=True
+    )
     name: Mapped[str] = mapped_column(String(100))
     status: Mapped[str] = mapped_column(String(10))
     created_at: Mapped[creation_time]
+    # Подтверждённые записи клиента (поддерживаются триггером, см. db.triggers)
+    visits_count: Mapped[int] = mapped_column(server_default=text('0'))
+    last_visit_at: Mapped[datetime | None]
 
 
 class Master(Base):
@@ -30,7 +74,7 @@ class Master(Base):
 
     # Основные поля в таблице
     id: Mapped[int_pk]
-    phone: Mapped[str] = mapped_column(String(20))
+    phone: Mapped[str] = mapped_column(String(20), unique=True)
     name: Mapped[str] = mapped_column(String(100))
 
     # Отношения с другими ORM
@@ -39,6 +83,34 @@ class Master(Base):
         cascade="all, delete-orphan",
         passive_deletes=True
     )
+    blocks: Mapped[list['MasterBlock']] = relationship(
+        back_populates='master',
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+
+class MasterBlock(Base):
+    """Регулярная блокировка времени мастера (выходной, перерыв и т.п.).
+
+    Хранится как правило, а не как набор занятых интервалов: день недели
+    (0 - понедельник), время начала и конца и необязательный срок действия.
+    """
+    __tablename__ = 'master_blocks'
+
+    # Основные поля в таблице
+    id: Mapped[int_pk]
+    master_id: Mapped[int] = mapped_column(
+        ForeignKey('masters.id', ondelete='CASCADE'), index=True
+    )
+    weekday: Mapped[int]
+    start_time: Mapped[time]
+    end_time: Mapped[time]
+    valid_from: Mapped[date | None]
+    valid_to: Mapped[date | None]
+
+    # Отношения с другими ORM
+    master: Mapped['Master'] = relationship(back_populates='blocks')
 
 
 class Service(Base):
@@ -46,7 +118,7 @@ class Service(Base):
 
     # Основные поля в таблице
     id: Mapped[int_pk]
-    name: Mapped[str] = mapped_column(String(100))
+    name: Mapped[str] = mapped_column(String(100), unique=True)
 
     # Отношения с другими ORM
     offerings: Mapped[list['Offering']] = relationship(
@@ -58,6 +130,10 @@ class Service(Base):
 
 class Offering(Base):
     __tablename__ = 'offerings'
+    __table_args__ = (
+        # У мастера не может быть двух одинаковых услуг
+        UniqueConstraint('master_id', 'service_id'),
+    )
 
     # Основные поля в таблице
     id: Mapped[int_pk]
@@ -77,6 +153,18 @@ class Offering(Base):
 
 class Occupation(Base):
     __tablename__ = 'occupations'
+    __table_args__ = (
+        # Выборка записей за период (календарь администратора)
+        Index('ix_occupations_start', 'start'),
+        # Запрет пересечения занятого времени у одного мастера
+        # (его GiST-индекс обслуживает и поиск занятости в окне времени)
+        ExcludeConstraint(
+            ('master_id', '='),
+            ('period', '&&'),
+            name='ex_occupations_master_id_period',
+            using='gist'
+        ),
+    )
 
     id: Mapped[int_pk]
     master_id: Mapped[int] = mapped_column(
@@ -84,10 +172,26 @@ class Occupation(Base):
     )
     start: Mapped[datetime]
     end: Mapped[datetime]
+    period: Mapped[Range[datetime]] = mapped_column(
+        TSRANGE, Computed('tsrange(start, "end")', persisted=True)
+    )
+
+
+# Номера цепочек записей (запись на несколько услуг подряд)
+appointment_bundle_seq = Sequence('appointment_bundle_id_seq', metadata=Base.metadata)
 
 
 class Appointment(Base):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Постраничный вывод записей и фильтр по услугам мастера
+        Index('ix_appointments_created_at_id', 'created_at', 'id'),
+        Index('ix_appointments_offering_id', 'offering_id'),
+        Index('ix_appointments_occupation_id', 'occupation_id'),
+        Index('ix_appointments_customer_id', 'customer_id'),
+        # Записи одной цепочки подтверждаются и удаляются вместе
+        Index('ix_appointments_bundle_id', 'bundle_id'),
+    )
 
     # Основные поля в таблице
     id: Mapped[int_pk]
@@ -104,6 +208,8 @@ class Appointment(Base):
     confirmed: Mapped[bool] = mapped_column(default=False)
     secret_code: Mapped[str] = mapped_column(String(8))
     attempts: Mapped[int] = mapped_column(default=5)
+    # Цепочка записей с общим кодом подтверждения (None - одиночная запись)
+    bundle_id: Mapped[int | None]
     created_at: Mapped[creation_time]
 
     # Отношения с другими ORM
@@ -114,3 +220,31 @@ class Appointment(Base):
     @hybrid_property
     def phone(self) -> str:
         return self.customer.phone
+
+
+class NotificationOutbox(Base):
+    """Уведомления, ожидающие отправки в очередь брокера.
+
+    Записываются в той же транзакции, что и изменения, к которым относятся,
+    и отправляются фоновым процессом (см. rabbitmq.outbox).
+    """
+    __tablename__ = 'notification_outbox'
+
+    id: Mapped[int_pk]
+    queue: Mapped[str] = mapped_column(String(100))
+    payload: Mapped[dict] = mapped_column(JSONB)
+    created_at: Mapped[creation_time]
+
+
+class Stats(Base):
+    """Счётчики для панели администратора, разбитые на строки-шарды.
+
+    Поддерживаются триггерами в БД (см. db.triggers): каждое изменение
+    попадает в случайный шард, а значение счётчика - сумма по всем строкам.
+    """
+    __tablename__ = 'stats'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    appointments: Mapped[int] = mapped_column(server_default=text('0'))
+    confirmed_appointments: Mapped[int] = mapped_column(server_default=text('0'))
+    customers: Mapped[int] = mapped_column(server_default=text('0'))
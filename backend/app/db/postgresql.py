@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 
 from . import POSTGRES_HOST, POSTGRES_PORT, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_NAME
 from .models import Base
+from . import triggers  # noqa: F401 - регистрация триггеров для create_tables
 
 
 URL = f'postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_NAME}'
@@ -25,7 +26,16 @@ async def get_session():
             raise e
             
 
+def create_missing_indexes(conn) -> None:
+    """Создание индексов, которых нет у уже существующих таблиц
+    (create_all создаёт индексы только вместе с новой таблицей)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def create_tables():
     """Создание всех таблиц"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
@@ -1,9 +1,16 @@
+import base64
+import binascii
+from datetime import datetime
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import select, insert
+from sqlalchemy import ColumnElement, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm.interfaces import ORMOption
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Type, TypeVar
+from typing import Iterable, Type, TypeVar
+
+from .models import Occupation
 
 
 ORM = TypeVar('ORM', bound=DeclarativeBase)
@@ -16,6 +23,66 @@ async def select_all(session: AsyncSession, model: DeclarativeBase) -> list:
     return result.scalars().all()
 
 
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Курсор страницы по ключу (created_at, id) последней отданной записи"""
+    raw = f'{created_at.isoformat()}|{id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Разбор курсора страницы (при некорректном курсоре возвращает 400)"""
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Cursor is incorrect'
+        )
+
+
+async def select_page(
+    session: AsyncSession,
+    model: Type[ORM],
+    filters: Iterable[ColumnElement[bool]] = (),
+    options: Iterable[ORMOption] = (),
+    cursor: str | None = None,
+    limit: int | None = None,
+    outerjoins: Iterable[tuple[Type[DeclarativeBase], ColumnElement[bool]]] = ()
+) -> tuple[list[ORM], str | None]:
+    """Получение страницы записей определённой модели (новые первыми).
+
+    Пагинация по ключу (created_at, id): следующая страница начинается сразу
+    после записи из курсора, поэтому запрос не зависит от номера страницы.
+    Возвращает записи и курсор следующей страницы (None, если она пустая).
+    ``outerjoins`` - связанные таблицы (с условием соединения) для фильтров.
+    """
+    query = select(model)
+    for target, onclause in outerjoins:
+        query = query.outerjoin(target, onclause)
+    query = (
+        query
+        .where(*filters)
+        .options(*options)
+        .order_by(model.created_at.desc(), model.id.desc())
+    )
+    if cursor is not None:
+        query = query.where(
+            tuple_(model.created_at, model.id) < tuple_(*decode_cursor(cursor))
+        )
+    if limit is not None:
+        # Лишняя запись показывает, что следующая страница не пустая
+        query = query.limit(limit + 1)
+    result = await session.execute(query)
+    items = list(result.scalars().all())
+
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+
 async def select_one(
     session: AsyncSession,
     model: Type[ORM],
@@ -32,30 +99,49 @@ async def insert_one(
     session: AsyncSession,
     model: Type[ORM],
     schema: BaseModel,
-    exists_filter: dict,
     error_msg: str = 'This object already exists'
 ) -> ORM:
-    """Добавляет в таблицу определённой модели запись по схеме"""
-    # Проверка, что такой объект уже существует
-    if await select_one(session, model, exists_filter) is not None:
+    """Добавляет в таблицу определённой модели запись по схеме
+    (при нарушении уникальности возвращает 409)"""
+    # Вставка и возврат новой записи одним запросом
+    result = await session.execute(
+        pg_insert(model)
+        .values(**schema.model_dump())
+        .on_conflict_do_nothing()
+        .returning(model)
+    )
+    new_obj = result.scalar_one_or_none()
+    # Пустой ответ - такой объект уже существует
+    if new_obj is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=error_msg
         )
 
-    # Создаём словарь с данными для вставки
-    data = schema.model_dump()
-    
-    # Вставка и возврат новой записи
-    result = await session.execute(
-        insert(model)
-        .values(**data)
-        .returning(model)
-    )
-    new_obj = result.scalar_one()
+    # Отвязываем объект от сессии, чтобы commit не сбросил его атрибуты
+    session.expunge(new_obj)
     await session.commit()
-    
-    # Явно загружаем все атрибуты
-    await session.refresh(new_obj)
-    
+
     return new_obj
+
+
+async def select_busy_intervals(
+    session: AsyncSession,
+    master_ids: Iterable[int],
+    window_start: datetime,
+    window_end: datetime
+) -> list[tuple[int, datetime, datetime]]:
+    """Получение занятых интервалов мастеров, пересекающихся с окном времени.
+
+    Пересечение проверяется по диапазону ``period`` - это условие обслуживает
+    GiST-индекс ограничения на пересечения, поэтому прошлые записи мастера
+    не просматриваются.
+    """
+    result = await session.execute(
+        select(Occupation.master_id, Occupation.start, Occupation.end)
+        .where(
+            Occupation.master_id.in_(master_ids),
+            Occupation.period.overlaps(func.tsrange(window_start, window_end))
+        )
+    )
+    return [tuple(row) for row in result.all()]
@@ -0,0 +1,287 @@
+from sqlalchemy import DDL, event
+
+from .models import Base
+
+
+# Триггеры создаются после всех таблиц при каждом запуске (create_tables),
+# поэтому все команды идемпотентны. Каждая команда - отдельный DDL:
+# asyncpg не выполняет несколько команд в одном запросе.
+
+# Таблицы, созданные до появления новых столбцов и ограничений, create_all
+# не меняет (тома с данными БД сохраняются между запусками), поэтому
+# недостающее добавляется отдельно. Имена ограничений уникальности - те,
+# что Postgres даёт им при создании таблицы, так что на новой БД эти
+# команды ничего не делают.
+
+
+def check_unique_ddl(index: str, table: str, columns: str) -> DDL:
+    """Проверка перед созданием уникального индекса на существующих данных.
+
+    Дубликаты в каталоге нельзя объединить автоматически (на них ссылаются
+    услуги и записи), поэтому запуск останавливается с понятным сообщением.
+    """
+    return DDL(f'''
+        DO $$
+        DECLARE
+            duplicates bigint;
+        BEGIN
+            IF to_regclass('{index}') IS NULL THEN
+                SELECT count(*) INTO duplicates FROM (
+                    SELECT 1 FROM {table} GROUP BY {columns} HAVING count(*) > 1
+                ) d;
+                IF duplicates > 0 THEN
+                    RAISE EXCEPTION USING
+                        MESSAGE = 'Migration required: ' || duplicates
+                            || ' duplicate value(s) of {table} ({columns})',
+                        HINT = 'Remove or rename the duplicates, then restart '
+                            || 'the backend to create {index}';
+                END IF;
+            END IF;
+        END
+        $$
+    ''')
+
+
+SCHEMA_DDL = [
+    # Агрегаты клиентов (нужны уже при объединении дубликатов ниже)
+    DDL('''
+        ALTER TABLE customers
+        ADD COLUMN IF NOT EXISTS visits_count integer NOT NULL DEFAULT 0
+    '''),
+    DDL('''
+        ALTER TABLE customers
+        ADD COLUMN IF NOT EXISTS last_visit_at timestamp without time zone
+    '''),
+    # Нормализованный номер телефона клиента (upsert по ON CONFLICT)
+    DDL('''
+        ALTER TABLE customers
+        ADD COLUMN IF NOT EXISTS phone_key varchar(20)
+        GENERATED ALWAYS AS (regexp_replace(phone, '[^0-9]', '', 'g')) STORED
+    '''),
+    # Разовое объединение клиентов с одинаковым номером (до уникального
+    # индекса): записи переходят к самому старому клиенту, блокировка
+    # сохраняется, визиты пересчитываются
+    DDL('''
+        DO $$
+        BEGIN
+            IF to_regclass('customers_phone_key_key') IS NULL THEN
+                CREATE TEMPORARY TABLE customer_merge ON COMMIT DROP AS
+                SELECT id, min(id) OVER (PARTITION BY phone_key) AS keep_id
+                FROM customers
+                WHERE phone_key <> '';
+                DELETE FROM customer_merge WHERE id = keep_id;
+
+                UPDATE appointments a
+                SET customer_id = m.keep_id
+                FROM customer_merge m
+                WHERE a.customer_id = m.id;
+
+                UPDATE customers c
+                SET status = 'blocked'
+                FROM customer_merge m
+                JOIN customers d ON d.id = m.id
+                WHERE c.id = m.keep_id AND d.status = 'blocked';
+
+                DELETE FROM customers c
+                USING customer_merge m
+                WHERE c.id = m.id;
+
+                UPDATE customers c
+                SET visits_count = (
+                        SELECT count(*) FROM appointments a
+                        WHERE a.customer_id = c.id AND a.confirmed
+                    ),
+                    last_visit_at = (
+                        SELECT max(o.start)
+                        FROM appointments a
+                        JOIN occupations o ON o.id = a.occupation_id
+                        WHERE a.customer_id = c.id AND a.confirmed
+                    )
+                WHERE c.id IN (SELECT keep_id FROM customer_merge);
+            END IF;
+        END
+        $$
+    '''),
+    # Номера без цифр объединять нельзя - это разные люди
+    check_unique_ddl('customers_phone_key_key', 'customers', 'phone_key'),
+    DDL('''
+        CREATE UNIQUE INDEX IF NOT EXISTS customers_phone_key_key
+        ON customers (phone_key)
+    '''),
+    # Занятое время мастера как диапазон и запрет его пересечений
+    DDL('''
+        ALTER TABLE occupations
+        ADD COLUMN IF NOT EXISTS period tsrange
+        GENERATED ALWAYS AS (tsrange(start, "end")) STORED
+    '''),
+    DDL('''
+        DO $$
+        DECLARE
+            conflicts text;
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conname = 'ex_occupations_master_id_period'
+            ) THEN
+                -- Двойные записи (до ограничения) удаляются только вручную
+                SELECT string_agg(a.id || '/' || b.id, ', ') INTO conflicts
+                FROM occupations a
+                JOIN occupations b
+                    ON b.master_id = a.master_id
+                    AND b.id > a.id
+                    AND b.start < a."end"
+                    AND a.start < b."end";
+                IF conflicts IS NOT NULL THEN
+                    RAISE EXCEPTION USING
+                        MESSAGE = 'Migration required: overlapping occupations '
+                            || '(id/id): ' || conflicts,
+                        HINT = 'Delete or move one appointment of each pair, '
+                            || 'then restart the backend';
+                END IF;
+                ALTER TABLE occupations
+                ADD CONSTRAINT ex_occupations_master_id_period
+                EXCLUDE USING gist (master_id WITH =, period WITH &&);
+            END IF;
+        END
+        $$
+    '''),
+    # Цепочки записей на несколько услуг подряд
+    DDL('''
+        ALTER TABLE appointments
+        ADD COLUMN IF NOT EXISTS bundle_id integer
+    '''),
+    # Уникальность объектов каталога (вставка через ON CONFLICT DO NOTHING)
+    check_unique_ddl('masters_phone_key', 'masters', 'phone'),
+    DDL('''
+        CREATE UNIQUE INDEX IF NOT EXISTS masters_phone_key
+        ON masters (phone)
+    '''),
+    check_unique_ddl('services_name_key', 'services', 'name'),
+    DDL('''
+        CREATE UNIQUE INDEX IF NOT EXISTS services_name_key
+        ON services (name)
+    '''),
+    check_unique_ddl(
+        'offerings_master_id_service_id_key', 'offerings', 'master_id, service_id'
+    ),
+    DDL('''
+        CREATE UNIQUE INDEX IF NOT EXISTS offerings_master_id_service_id_key
+        ON offerings (master_id, service_id)
+    '''),
+]
+
+# Число строк-шардов счётчиков: триггер меняет случайный шард, поэтому
+# параллельные записи не ждут друг друга на блокировке одной строки
+STATS_SHARDS = 16
+
+STATS_DDL = [
+    # Счётчики записей
+    DDL('''
+        CREATE OR REPLACE FUNCTION stats_appointments() RETURNS trigger AS $$
+        DECLARE
+            shard integer := floor(random() * %(shards)d)::integer;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE stats
+                SET appointments = appointments + 1,
+                    confirmed_appointments = confirmed_appointments + NEW.confirmed::int
+                WHERE id = shard;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE stats
+                SET appointments = appointments - 1,
+                    confirmed_appointments = confirmed_appointments - OLD.confirmed::int
+                WHERE id = shard;
+            ELSIF NEW.confirmed IS DISTINCT FROM OLD.confirmed THEN
+                UPDATE stats
+                SET confirmed_appointments = confirmed_appointments
+                    + NEW.confirmed::int - OLD.confirmed::int
+                WHERE id = shard;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''' % {'shards': STATS_SHARDS}),
+    DDL('''
+        CREATE OR REPLACE TRIGGER trg_appointments_stats
+        AFTER INSERT OR DELETE OR UPDATE OF confirmed ON appointments
+        FOR EACH ROW EXECUTE FUNCTION stats_appointments()
+    '''),
+    # Счётчик клиентов
+    DDL('''
+        CREATE OR REPLACE FUNCTION stats_customers() RETURNS trigger AS $$
+        DECLARE
+            shard integer := floor(random() * %(shards)d)::integer;
+        BEGIN
+            UPDATE stats
+            SET customers = customers + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END
+            WHERE id = shard;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''' % {'shards': STATS_SHARDS}),
+    DDL('''
+        CREATE OR REPLACE TRIGGER trg_customers_stats
+        AFTER INSERT OR DELETE ON customers
+        FOR EACH ROW EXECUTE FUNCTION stats_customers()
+    '''),
+    # Начальное заполнение счётчиков (только если таблица ещё пустая)
+    DDL('''
+        INSERT INTO stats (id, appointments, confirmed_appointments, customers)
+        SELECT
+            0,
+            (SELECT count(*) FROM appointments),
+            (SELECT count(*) FROM appointments WHERE confirmed),
+            (SELECT count(*) FROM customers)
+        WHERE NOT EXISTS (SELECT 1 FROM stats)
+    '''),
+    # Остальные шарды начинаются с нуля (уже существующие строки не меняются)
+    DDL('''
+        INSERT INTO stats (id)
+        SELECT generate_series(0, %(shards)d - 1)
+        ON CONFLICT (id) DO NOTHING
+    ''' % {'shards': STATS_SHARDS}),
+]
+
+VISITS_DDL = [
+    # Столбцы визитов добавляются в SCHEMA_DDL
+    # Визит - подтверждённая запись; время визита - начало её слота
+    DDL('''
+        CREATE OR REPLACE FUNCTION customer_visits() RETURNS trigger AS $$
+        DECLARE
+            was_visit boolean := TG_OP <> 'INSERT' AND OLD.confirmed;
+            is_visit boolean := TG_OP <> 'DELETE' AND NEW.confirmed;
+        BEGIN
+            IF is_visit AND NOT was_visit THEN
+                UPDATE customers
+                SET visits_count = visits_count + 1,
+                    last_visit_at = GREATEST(
+                        last_visit_at,
+                        (SELECT start FROM occupations WHERE id = NEW.occupation_id)
+                    )
+                WHERE id = NEW.customer_id;
+            ELSIF was_visit AND NOT is_visit THEN
+                UPDATE customers
+                SET visits_count = visits_count - 1,
+                    last_visit_at = (
+                        SELECT max(o.start)
+                        FROM appointments a
+                        JOIN occupations o ON o.id = a.occupation_id
+                        WHERE a.customer_id = OLD.customer_id
+                            AND a.confirmed
+                            AND a.id <> OLD.id
+                    )
+                WHERE id = OLD.customer_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    '''),
+    DDL('''
+        CREATE OR REPLACE TRIGGER trg_appointments_customer_visits
+        AFTER INSERT OR DELETE OR UPDATE OF confirmed ON appointments
+        FOR EACH ROW EXECUTE FUNCTION customer_visits()
+    '''),
+]
+
+for ddl in SCHEMA_DDL + STATS_DDL + VISITS_DDL:
+    event.listen(Base.metadata, 'after_create', ddl)
@@ -10,3 +10,13 @@ RMQ_USERNAME = getenv('RMQ_USERNAME')
 RMQ_PASSWORD = getenv('RMQ_PASSWORD')
 
 RMQ_URL = f'amqp://{RMQ_USERNAME}:{RMQ_PASSWORD}@{RMQ_HOST}:{RMQ_PORT}/'
+
+# Каналов для публикации на процесс (одно соединение на процесс)
+RMQ_CHANNEL_POOL_SIZE = int(getenv('RMQ_CHANNEL_POOL_SIZE', 10))
+
+# Очередь уведомлений для бота WhatsApp
+NOTIFICATIONS_QUEUE = 'whatsapp_notifications'
+
+# Отправка уведомлений из outbox: размер пачки и интервал опроса таблицы
+OUTBOX_BATCH_SIZE = int(getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_SECONDS = float(getenv('OUTBOX_POLL_SECONDS', 1))
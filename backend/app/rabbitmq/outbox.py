@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+from sqlalchemy import select, delete
+
+from db.models import NotificationOutbox
+from db.postgresql import session_factory
+from .config import NOTIFICATIONS_QUEUE, OUTBOX_BATCH_SIZE, OUTBOX_POLL_SECONDS
+from .publisher import Publisher, publisher
+
+
+logger = logging.getLogger(__name__)
+
+# Максимальная пауза между попытками при недоступности брокера
+MAX_RETRY_SECONDS = 30
+
+
+def confirmation_notification(phone: str, code: str) -> dict:
+    """Значения строки outbox с кодом подтверждения записи"""
+    return {
+        'queue': NOTIFICATIONS_QUEUE,
+        'payload': {
+            'message': 'confirmation',
+            'detail': {
+                'phone': phone,
+                'code': code
+            }
+        }
+    }
+
+
+class OutboxRelay:
+    """Фоновая отправка уведомлений из таблицы outbox в брокер.
+
+    Уведомления забираются пачками (``FOR UPDATE SKIP LOCKED`` - несколько
+    процессов не отправят одно и то же дважды), публикуются через общий пул
+    каналов с подтверждением от брокера и удаляются из таблицы только после
+    подтверждения. Если брокер недоступен, строки остаются в таблице и
+    отправляются позже.
+    """
+
+    def __init__(self, publisher: Publisher, batch_size: int, poll_seconds: float):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Запуск фоновой отправки"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой отправки"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """Сигнал о новых уведомлениях (отправка начнётся без ожидания опроса,
+        если отправка не отложена после ошибки)"""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        delay = self.poll_seconds
+        while True:
+            if delay > self.poll_seconds:
+                # После ошибки новые уведомления не прерывают паузу, иначе
+                # при недоступном брокере каждая запись вызывала бы попытку
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                # Полная пачка - в таблице могут быть ещё уведомления
+                while await self._relay_batch() == self.batch_size:
+                    pass
+                delay = self.poll_seconds
+            except Exception as e:
+                logger.error(f'Outbox relay error: {e}')
+                delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+    async def _relay_batch(self) -> int:
+        """Отправка одной пачки уведомлений, возвращает её размер"""
+        async with session_factory() as session:
+            result = await session.execute(
+                select(NotificationOutbox)
+                .order_by(NotificationOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            notifications = result.scalars().all()
+            if not notifications:
+                return 0
+
+            # При недоступном брокере пачка не разбирается по одному сообщению
+            await self.publisher.connect()
+            # Публикации пачки ожидают подтверждений брокера параллельно
+            results = await asyncio.gather(
+                *(self._publish(notification) for notification in notifications),
+                return_exceptions=True
+            )
+            sent = [
+                notification.id
+                for notification, result in zip(notifications, results)
+                if not isinstance(result, BaseException)
+            ]
+            if sent:
+                await session.execute(
+                    delete(NotificationOutbox).where(NotificationOutbox.id.in_(sent))
+                )
+            await session.commit()
+
+        failed = len(notifications) - len(sent)
+        if failed:
+            raise RuntimeError(f'{failed} notification(s) were not published')
+        return len(notifications)
+
+    async def _publish(self, notification: NotificationOutbox) -> None:
+        await self.publisher.publish(
+            json.dumps(notification.payload),
+            queue=notification.queue,
+            message_id=str(notification.id),
+            timestamp=notification.created_at
+        )
+
+
+outbox_relay = OutboxRelay(publisher, OUTBOX_BATCH_SIZE, OUTBOX_POLL_SECONDS)
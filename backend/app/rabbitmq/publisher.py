@@ -0,0 +1,68 @@
+import asyncio
+import aio_pika
+from aio_pika.abc import AbstractRobustChannel, AbstractRobustConnection
+from aio_pika.pool import Pool
+
+from .config import RMQ_URL, RMQ_CHANNEL_POOL_SIZE
+
+
+class Publisher:
+    """Общее для процесса соединение с брокером и пул каналов для публикации.
+
+    Соединение открывается при первой публикации и само восстанавливается
+    после обрыва (``connect_robust``). Каналы работают с подтверждениями
+    брокера, поэтому одновременные публикации распределяются по пулу, а не
+    ждут друг друга на одном канале.
+    """
+
+    def __init__(self, url: str, pool_size: int):
+        self._url = url
+        self._pool_size = pool_size
+        self._connection: AbstractRobustConnection | None = None
+        self._channels: Pool[AbstractRobustChannel] | None = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> AbstractRobustConnection:
+        """Соединение с брокером (открывается при первом обращении)"""
+        async with self._lock:
+            if self._connection is None:
+                self._connection = await aio_pika.connect_robust(self._url)
+        return self._connection
+
+    async def _create_channel(self) -> AbstractRobustChannel:
+        connection = await self.connect()
+        return await connection.channel(
+            publisher_confirms=True,
+            # Сообщение без очереди-получателя - ошибка, а не потеря
+            on_return_raises=True
+        )
+
+    async def publish(self, body: str, queue: str, **properties) -> None:
+        """Публикация сообщения в очередь (с ожиданием подтверждения брокера)"""
+        if self._channels is None:
+            self._channels = Pool(self._create_channel, max_size=self._pool_size)
+        async with self._channels.acquire() as channel:
+            if channel.is_closed:
+                await channel.reopen()
+            await channel.default_exchange.publish(
+                aio_pika.Message(
+                    body.encode(),
+                    content_type='text/plain',
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    **properties
+                ),
+                routing_key=queue,
+                mandatory=True
+            )
+
+    async def close(self) -> None:
+        """Закрытие каналов и соединения с брокером"""
+        if self._channels is not None:
+            await self._channels.close()
+            self._channels = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+publisher = Publisher(RMQ_URL, RMQ_CHANNEL_POOL_SIZE)
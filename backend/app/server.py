@@ -4,9 +4,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from core.exceptions import register_exception_handlers
 from db.postgresql import create_tables
 from api import routers as api_routers
+from rabbitmq.outbox import outbox_relay
+from rabbitmq.publisher import publisher
 
 
-app = FastAPI(on_startup=[create_tables])
+app = FastAPI(
+    on_startup=[create_tables, outbox_relay.start],
+    # Сначала останавливается отправка, затем закрывается соединение с брокером
+    on_shutdown=[outbox_relay.stop, publisher.close]
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +20,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['ETag', 'X-Next-Cursor'],
 )
 
 # Регистрация всех кастомных обработчиков ошибок
@@ -1,47 +1,124 @@
 import logging
 import asyncio
 import json
-from faststream.rabbit import RabbitBroker
+from faststream.rabbit import RabbitBroker, RabbitQueue
+from faststream.rabbit.annotations import RabbitMessage
 
-from .config import RMQ_URL
-from .greenapi import send_whatsapp_message
+from .config import (
+    RMQ_URL, NOTIFICATIONS_QUEUE, PARKED_QUEUE, PARKED_TTL,
+    CONCURRENCY, PREFETCH, RATE_LIMIT, RATE_BURST, METRICS_INTERVAL
+)
+from .greenapi import (
+    GreenApiUnavailable, breaker, get_chat_id, send_whatsapp_message, close_client
+)
+from .limits import KeyedLock, TokenBucket
+from .metrics import Metrics
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-broker = RabbitBroker(RMQ_URL, max_consumers=1)
+# Prefetch limits unacked messages held by the bot; sends run concurrently
+# (up to CONCURRENCY) within Green API's rate limit, one at a time per chat
+broker = RabbitBroker(RMQ_URL, max_consumers=PREFETCH)
+sending = asyncio.Semaphore(CONCURRENCY)
+rate_limiter = TokenBucket(RATE_LIMIT, RATE_BURST)
+chat_locks = KeyedLock()
+metrics = Metrics()
 
+# Parking queue: no consumers, expired messages are dead-lettered back
+# to the main queue through the default exchange
+parked_queue = RabbitQueue(
+    PARKED_QUEUE,
+    durable=True,
+    arguments={
+        "x-message-ttl": int(PARKED_TTL * 1000),
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": NOTIFICATIONS_QUEUE,
+    }
+)
 
-@broker.subscriber('whatsapp_notifications')
-async def handle_audio(data: str):
+
+async def park_message(data: str, message: RabbitMessage):
+    """Return a message to RabbitMQ to be retried after PARKED_TTL"""
+    await broker.publish(
+        data,
+        queue=PARKED_QUEUE,
+        persist=True,
+        message_id=message.message_id,
+        # Keep the original publish time for the queue lag metric
+        timestamp=message.raw_message.timestamp
+    )
+
+
+@broker.subscriber(NOTIFICATIONS_QUEUE, no_ack=True)
+async def handle_notification(data: str, message: RabbitMessage):
+    """Send a notification; the message is acked only after it is handled"""
     try:
         body = json.loads(data)
         # Считываем поля JSON, начинаем обработку
-        message = body['message']
-        detail  = body['detail']
-        
-        if message == 'confirmation':
-            phone = detail['phone']
-            code  = detail['code']
-            logger.info(f"Sending confirmation code {code} to {phone}")
-            result = send_whatsapp_message(phone, f"Ваш код подтверждения: {code}")
-            if result:
-                logger.info(f"Successfully sent confirmation code to {phone}")
-            else:
-                logger.error(f"Failed to send confirmation code to {phone}")
-    except Exception as e:
-        logger.error(f"Error processing message: {e}", exc_info=True)
+        if body['message'] != 'confirmation':
+            await message.ack()
+            return
+        phone = body['detail']['phone']
+        code = body['detail']['code']
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Invalid message, dropping it: {e}")
+        await message.reject()
         return
 
+    # Messages of one chat are sent in the order they were received
+    async with chat_locks.hold(get_chat_id(phone)):
+        try:
+            if breaker.state == "open":
+                raise GreenApiUnavailable("circuit breaker is open")
+            async with sending:
+                await rate_limiter.acquire()
+                metrics.observe_lag(message.raw_message.timestamp)
+                logger.info(f"Sending confirmation code {code} to {phone}")
+                result = await send_whatsapp_message(phone, f"Ваш код подтверждения: {code}")
+        except GreenApiUnavailable as e:
+            logger.warning(f"Green API unavailable ({e}), parking message")
+            try:
+                await park_message(data, message)
+            except Exception as park_error:
+                logger.error(f"Failed to park message: {park_error}")
+                await message.nack(requeue=True)
+                return
+            metrics.parked += 1
+            await message.ack()
+            return
+        except Exception as e:
+            logger.error(f"Error processing message: {e}", exc_info=True)
+            metrics.failed += 1
+            await message.reject()
+            return
+
+    if result:
+        logger.info(f"Successfully sent confirmation code to {phone}")
+        metrics.sent += 1
+        await message.ack()
+    else:
+        # Rejected by Green API (e.g. invalid number): retrying will not help
+        logger.error(f"Failed to send confirmation code to {phone}")
+        metrics.failed += 1
+        await message.reject()
+
 
 async def main():
-    async with broker:
-        await broker.start()
-        while True:
-            await asyncio.sleep(3600)
+    metrics_task = asyncio.create_task(metrics.run(METRICS_INTERVAL))
+    try:
+        async with broker:
+            # The parking queue must exist before the first message is parked
+            await broker.declare_queue(parked_queue)
+            await broker.start()
+            while True:
+                await asyncio.sleep(3600)
+    finally:
+        metrics_task.cancel()
+        await close_client()
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
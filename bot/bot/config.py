@@ -8,9 +8,38 @@ API_TOKEN = getenv("GREENAPI_API_TOKEN") or ""
 
 BASE_URL = f"https://api.green-api.com/waInstance{INSTANCE_ID}"
 
+# HTTP client settings for Green API (seconds / connections)
+HTTP_TIMEOUT = float(getenv("GREENAPI_HTTP_TIMEOUT") or 10)
+HTTP_CONNECT_TIMEOUT = float(getenv("GREENAPI_HTTP_CONNECT_TIMEOUT") or 5)
+HTTP_MAX_CONNECTIONS = int(getenv("GREENAPI_HTTP_MAX_CONNECTIONS") or 20)
+
+# How long a successful token verification is trusted (seconds)
+TOKEN_TTL = float(getenv("GREENAPI_TOKEN_TTL") or 300)
+
+# Circuit breaker: consecutive failures to open it and seconds until a retry
+BREAKER_FAILURE_THRESHOLD = int(getenv("GREENAPI_BREAKER_FAILURES") or 5)
+BREAKER_RESET_TIMEOUT = float(getenv("GREENAPI_BREAKER_RESET_TIMEOUT") or 30)
+
 RMQ_HOST = getenv("RMQ_HOST")
 RMQ_PORT = getenv("RMQ_PORT")
 RMQ_USERNAME = getenv("RMQ_USERNAME")
 RMQ_PASSWORD = getenv("RMQ_PASSWORD")
 
 RMQ_URL = f"amqp://{RMQ_USERNAME}:{RMQ_PASSWORD}@{RMQ_HOST}:{RMQ_PORT}/"
+
+# Consumer: messages sent in parallel and messages prefetched from RabbitMQ
+CONCURRENCY = int(getenv("BOT_CONCURRENCY") or 10)
+PREFETCH = int(getenv("BOT_PREFETCH") or 2 * CONCURRENCY)
+
+# Green API rate limit: sustained messages per second and burst size
+RATE_LIMIT = float(getenv("GREENAPI_RATE_LIMIT") or 5)
+RATE_BURST = int(getenv("GREENAPI_RATE_BURST") or RATE_LIMIT)
+
+# How often throughput and queue lag are logged (seconds)
+METRICS_INTERVAL = float(getenv("BOT_METRICS_INTERVAL") or 60)
+
+NOTIFICATIONS_QUEUE = "whatsapp_notifications"
+# Messages parked while Green API is unavailable return to the main queue
+# after this delay (seconds)
+PARKED_QUEUE = f"{NOTIFICATIONS_QUEUE}.parked"
+PARKED_TTL = float(getenv("PARKED_TTL") or BREAKER_RESET_TIMEOUT)
@@ -1,77 +1,165 @@
 import logging
-import requests
+import time
+import httpx
 
-from .config import BASE_URL, API_TOKEN
+from .breaker import CircuitBreaker
+from .config import (
+    BASE_URL, API_TOKEN, HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_MAX_CONNECTIONS,
+    TOKEN_TTL, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+)
+
+try:
+    import h2  # noqa: F401 - HTTP/2 support for httpx
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
 
 
 logger = logging.getLogger(__name__)
 
+_client: httpx.AsyncClient | None = None
 
-def verify_api_token():
-    """Verify if the Green API token is valid"""
-    url = f"{BASE_URL}/getSettings/{API_TOKEN}"
+# Monotonic time until which the token is known to be valid
+_token_valid_until = 0.0
+
+breaker = CircuitBreaker(
+    "green-api",
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=BREAKER_RESET_TIMEOUT
+)
+
+
+class GreenApiUnavailable(Exception):
+    """Green API is down (or the circuit breaker is open); retry the message later"""
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP client with a keep-alive connection pool (created lazily)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            http2=HTTP2,
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS
+            )
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared HTTP client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_chat_id(chat_id_or_phone: str) -> str:
+    """Green API chat ID for a phone number (or the chat ID itself)"""
+    # If it's already a chat ID (ends with @c.us), use it directly
+    if chat_id_or_phone.endswith("@c.us"):
+        return chat_id_or_phone
+    # For phone numbers, we need to format it as a chat ID for Green API
+    # The format is: phoneNumber@c.us
+    clean_phone = ''.join(filter(str.isdigit, chat_id_or_phone))
+    return f"{clean_phone}@c.us"
+
+
+async def _request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Request to Green API through the circuit breaker.
+
+    Network errors, timeouts, 5xx and 429 responses count as failures and
+    raise GreenApiUnavailable; any other response means the API is up.
+    """
+    if not breaker.allow():
+        raise GreenApiUnavailable("circuit breaker is open")
     try:
-        logger.info(f"Verifying API token with URL: {url}")
-        r = requests.get(url)
-        logger.info(f"Token verification response status: {r.status_code}")
-        if r.status_code == 200:
-            logger.info("API token is valid")
-            return True
-        else:
-            logger.error(f"API token verification failed with status {r.status_code}")
-            logger.error(f"Response: {r.text}")
-            return False
-    except requests.RequestException as e:
-        logger.error(f"API token verification failed: {e}")
+        r = await get_client().request(method, url, **kwargs)
+    except httpx.TransportError as e:
+        breaker.record_failure()
+        raise GreenApiUnavailable(str(e)) from e
+    except BaseException:
+        # Any other error (decoding, cancellation, ...) still ends the call,
+        # otherwise a half-open trial would block every later request
+        breaker.record_failure()
+        raise
+    if r.status_code >= 500 or r.status_code == 429:
+        breaker.record_failure()
+        raise GreenApiUnavailable(f"status {r.status_code}")
+    breaker.record_success()
+    return r
+
+
+async def verify_api_token():
+    """Verify if the Green API token is valid"""
+    global _token_valid_until
+    logger.info("Verifying API token")
+    r = await _request("GET", f"/getSettings/{API_TOKEN}")
+    logger.info(f"Token verification response status: {r.status_code}")
+    if r.status_code == 200:
+        logger.info("API token is valid")
+        _token_valid_until = time.monotonic() + TOKEN_TTL
+        return True
+    else:
+        logger.error(f"API token verification failed with status {r.status_code}")
+        logger.error(f"Response: {r.text}")
+        _token_valid_until = 0.0
         return False
 
 
-def send_whatsapp_message(chat_id_or_phone: str, text: str):
-    # First verify the API token
-    if not verify_api_token():
+async def ensure_api_token():
+    """Check the token, using the cached result while it is fresh"""
+    if time.monotonic() < _token_valid_until:
+        return True
+    return await verify_api_token()
+
+
+async def send_whatsapp_message(chat_id_or_phone: str, text: str):
+    """Send a text message.
+
+    Returns the Green API response, or None if the message was rejected.
+    Raises GreenApiUnavailable if Green API cannot be reached right now.
+    """
+    global _token_valid_until
+    if not await ensure_api_token():
         logger.error("API token verification failed, cannot send message")
         return None
-        
-    # Try sending as a regular text message first
-    url = f"{BASE_URL}/sendMessage/{API_TOKEN}"
-    try:
-        payload = {
-            "message": text
-        }
-        
-        # If it's already a chat ID (ends with @c.us), use chatId directly
-        if chat_id_or_phone.endswith("@c.us"):
-            payload["chatId"] = chat_id_or_phone
-        else:
-            # For phone numbers, we need to format it as a chat ID for Green API
-            # The format is: phoneNumber@c.us
-            clean_phone = ''.join(filter(str.isdigit, chat_id_or_phone))
-            payload["chatId"] = f"{clean_phone}@c.us"
-            
-        logger.info(f"Sending WhatsApp message to {chat_id_or_phone}")
-        logger.info(f"URL: {url}")
-        logger.info(f"Payload: {payload}")
-        
-        # Green API uses token in URL, not in headers
-        r = requests.post(url, json=payload)
-        logger.info(f"Response status: {r.status_code}")
-        if r.status_code != 200:
-            logger.info(f"Response headers: {r.headers}")
-            logger.info(f"Response text: {r.text}")
-        r.raise_for_status()
-        logger.debug(f"Sent → {chat_id_or_phone}: {text}")
-        result = r.json()
-        logger.info(f"Success response: {result}")
-        return result
-    except requests.RequestException as e:
-        logger.error(f"sendMessage: {e}")
-        if e.response:
-            logger.error(f"Response status: {e.response.status_code}")
-            logger.error(f"Response content: {e.response.text}")
+
+    payload = {
+        "message": text
+    }
+
+    payload["chatId"] = get_chat_id(chat_id_or_phone)
+
+    logger.info(f"Sending WhatsApp message to {chat_id_or_phone}")
+    logger.info(f"Payload: {payload}")
+
+    # Green API uses token in URL, not in headers
+    r = await _request("POST", f"/sendMessage/{API_TOKEN}", json=payload)
+    if r.status_code in (401, 403):
+        # The cached token check is stale: verify again and retry once
+        logger.warning(f"sendMessage auth failure ({r.status_code}), re-verifying token")
+        _token_valid_until = 0.0
+        if not await verify_api_token():
+            logger.error("API token verification failed, cannot send message")
+            return None
+        r = await _request("POST", f"/sendMessage/{API_TOKEN}", json=payload)
+
+    logger.info(f"Response status: {r.status_code}")
+    if r.status_code != 200:
+        logger.error(f"sendMessage failed with status {r.status_code}")
+        logger.error(f"Response content: {r.text}")
         return None
+    logger.debug(f"Sent → {chat_id_or_phone}: {text}")
+    result = r.json()
+    logger.info(f"Success response: {result}")
+    return result
 
 
 def send_whatsapp_message_create_chat(phone: str, text: str):
     """Send message using createChat method for new contacts - NOT RECOMMENDED"""
     logger.warning("createChat method should not be used as fallback for sendMessage failures")
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Consumer counters, logged and reset every interval"""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.started = time.monotonic()
+        self.sent = 0
+        self.failed = 0
+        self.parked = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.lag_count = 0
+
+    def observe_lag(self, published_at: datetime | None):
+        """Queue lag: time from publishing the message to starting its send"""
+        if published_at is None:
+            return
+        if published_at.tzinfo is None:
+            # AMQP timestamps without a zone are UTC
+            published_at = published_at.replace(tzinfo=timezone.utc)
+        lag = max(0.0, (datetime.now(timezone.utc) - published_at).total_seconds())
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_count += 1
+
+    def log(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        lag_avg = self.lag_total / self.lag_count if self.lag_count else 0.0
+        logger.info(
+            f"Notifications: sent={self.sent} failed={self.failed} parked={self.parked} "
+            f"throughput={self.sent / elapsed:.2f} msg/s "
+            f"lag avg={lag_avg:.1f}s max={self.lag_max:.1f}s"
+        )
+        self._reset()
+
+    async def run(self, interval: float):
+        """Log metrics every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            self.log()
@@ -7,33 +7,50 @@ import { Badge } from '@/components/ui/badge';
 import { adminApiService, Appointment } from '@/services/api';
 import { Search, CheckCircle, XCircle, Calendar } from 'lucide-react';
 
+// Appointments loaded per page of the list
+const PAGE_SIZE = 50;
+
 export default function AdminAppointments() {
   const [appointments, setAppointments] = useState<Appointment[]>([]);
   const [filteredAppointments, setFilteredAppointments] = useState<Appointment[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
 
+  const confirmed = statusFilter !== 'all' ? statusFilter === 'confirmed' : undefined;
+
   useEffect(() => {
+    let cancelled = false;
+
+    // First page for the selected status; the next ones are loaded on demand
     const fetchAppointments = async () => {
       try {
-        const data = await adminApiService.getAppointments();
-        setAppointments(data);
-        setFilteredAppointments(data);
+        const page = await adminApiService.getAppointmentsPage({ confirmed, limit: PAGE_SIZE });
+        if (!cancelled) {
+          setAppointments(page.items);
+          setNextCursor(page.nextCursor);
+        }
       } catch (error) {
         console.error('Failed to fetch appointments:', error);
       } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+        }
       }
     };
 
     fetchAppointments();
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [confirmed]);
 
   useEffect(() => {
     let result = appointments;
     
-    // Apply search filter
+    // Apply search filter (to the loaded appointments)
     if (searchTerm) {
       result = result.filter(appointment => 
         appointment.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
@@ -43,22 +60,35 @@ export default function AdminAppointments() {
       );
     }
     
-    // Apply status filter
-    if (statusFilter !== 'all') {
-      const isConfirmed = statusFilter === 'confirmed';
-      result = result.filter(appointment => appointment.confirmed === isConfirmed);
-    }
-    
     setFilteredAppointments(result);
-  }, [searchTerm, statusFilter, appointments]);
+  }, [searchTerm, appointments]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await adminApiService.getAppointmentsPage({
+        confirmed,
+        cursor: nextCursor,
+        limit: PAGE_SIZE
+      });
+      setAppointments(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to fetch appointments:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleConfirmAppointment = async (appointmentId: number) => {
     try {
       await adminApiService.confirmAppointment(appointmentId);
-      // Refresh the appointments list
-      const updatedAppointments = await adminApiService.getAppointments();
-      setAppointments(updatedAppointments);
-      setFilteredAppointments(updatedAppointments);
+      // Update the appointment in the loaded list
+      setAppointments(appointments
+        .map(a => a.id === appointmentId ? { ...a, confirmed: true } : a)
+        // The appointment no longer matches the status filter
+        .filter(a => confirmed === undefined || a.confirmed === confirmed));
     } catch (error) {
       console.error('Failed to confirm appointment:', error);
     }
@@ -69,7 +99,6 @@ export default function AdminAppointments() {
       await adminApiService.deleteAppointment(appointmentId);
       // Remove the appointment from the list
       setAppointments(appointments.filter(a => a.id !== appointmentId));
-      setFilteredAppointments(filteredAppointments.filter(a => a.id !== appointmentId));
     } catch (error) {
       console.error('Failed to delete appointment:', error);
     }
@@ -178,6 +207,14 @@ export default function AdminAppointments() {
             </TableBody>
           </Table>
           
+          {nextCursor && (
+            <div className="flex justify-center pt-4">
+              <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+                {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+              </Button>
+            </div>
+          )}
+
           {filteredAppointments.length === 0 && (
             <div className="flex flex-col items-center justify-center py-12 text-center">
               <Calendar className="h-12 w-12 text-muted-foreground mb-4" />
@@ -10,55 +10,83 @@ import { Dialog, DialogContent, DialogDescription, DialogFooter, DialogHeader, D
 import { adminApiService, Customer } from '@/services/api';
 import { Search, PlusCircle, Edit, User } from 'lucide-react';
 
+// Customers loaded per page of the list
+const PAGE_SIZE = 50;
+
 export default function AdminUsers() {
   const [customers, setCustomers] = useState<Customer[]>([]);
-  const [filteredCustomers, setFilteredCustomers] = useState<Customer[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [editingCustomer, setEditingCustomer] = useState<Customer | null>(null);
   const [newStatus, setNewStatus] = useState('active');
 
+  const status = statusFilter !== 'all' ? statusFilter : undefined;
+
   useEffect(() => {
+    let cancelled = false;
+
     const fetchCustomers = async () => {
       try {
-        const data = await adminApiService.getCustomers();
-        setCustomers(data);
-        setFilteredCustomers(data);
+        if (searchTerm.trim().length >= 2) {
+          // Server-side search by name or phone (filtered by status on the server)
+          const result = await adminApiService.searchCustomers(searchTerm.trim(), status);
+          if (!cancelled) {
+            setCustomers(result);
+            setNextCursor(null);
+          }
+        } else {
+          // First page of the list; the next ones are loaded on demand
+          const page = await adminApiService.getCustomersPage({ status, limit: PAGE_SIZE });
+          if (!cancelled) {
+            setCustomers(page.items);
+            setNextCursor(page.nextCursor);
+          }
+        }
       } catch (error) {
         console.error('Failed to fetch customers:', error);
       } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+        }
       }
     };
 
-    fetchCustomers();
-  }, []);
+    const timeout = setTimeout(fetchCustomers, searchTerm ? 300 : 0);
+    return () => {
+      cancelled = true;
+      clearTimeout(timeout);
+    };
+  }, [searchTerm, status]);
 
-  useEffect(() => {
-    let result = customers;
-    
-    // Apply search filter
-    if (searchTerm) {
-      result = result.filter(customer => 
-        customer.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        customer.phone.includes(searchTerm)
-      );
-    }
-    
-    // Apply status filter
-    if (statusFilter !== 'all') {
-      result = result.filter(customer => customer.status === statusFilter);
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await adminApiService.getCustomersPage({
+        status,
+        cursor: nextCursor,
+        limit: PAGE_SIZE
+      });
+      setCustomers(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to fetch customers:', error);
+    } finally {
+      setLoadingMore(false);
     }
-    
-    setFilteredCustomers(result);
-  }, [searchTerm, statusFilter, customers]);
+  };
 
-  const handleStatusChange = async (phone: string, status: string) => {
+  const handleStatusChange = async (phone: string, customerStatus: string) => {
     try {
-      const updatedCustomer = await adminApiService.updateCustomerStatus(phone, status);
-      setCustomers(customers.map(c => c.phone === phone ? updatedCustomer : c));
+      const updatedCustomer = await adminApiService.updateCustomerStatus(phone, customerStatus);
+      setCustomers(customers
+        .map(c => c.phone === phone ? updatedCustomer : c)
+        // The customer no longer matches the status filter
+        .filter(c => !status || c.status === status));
     } catch (error) {
       console.error('Failed to update customer status:', error);
     }
@@ -135,7 +163,7 @@ export default function AdminUsers() {
               </TableRow>
             </TableHeader>
             <TableBody>
-              {filteredCustomers.map((customer) => (
+              {customers.map((customer) => (
                 <TableRow key={customer.phone}>
                   <TableCell className="font-medium">{customer.name}</TableCell>
                   <TableCell>{customer.phone}</TableCell>
@@ -161,7 +189,15 @@ export default function AdminUsers() {
             </TableBody>
           </Table>
           
-          {filteredCustomers.length === 0 && (
+          {nextCursor && (
+            <div className="flex justify-center pt-4">
+              <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+                {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+              </Button>
+            </div>
+          )}
+
+          {customers.length === 0 && (
             <div className="flex flex-col items-center justify-center py-12 text-center">
               <User className="h-12 w-12 text-muted-foreground mb-4" />
               <h3 className="text-lg font-semibold mb-2">Клиенты не найдены</h3>
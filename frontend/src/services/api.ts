@@ -37,6 +37,7 @@ export interface Appointment {
     end: string;
   };
   confirmed: boolean;
+  bundle_id: number | null; // appointments booked as one chain share it
   created_at: string;
 }
 
@@ -46,6 +47,14 @@ export interface Customer {
   name: string;
   status: string;
   created_at: string;
+  visits_count: number;
+  last_visit_at: string | null;
+}
+
+// Page of a list endpoint; nextCursor is null on the last page
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
 }
 
 // Extend the existing interfaces for admin functionality
@@ -217,7 +226,7 @@ class AdminApiService {
     }
   }
 
-  private async request<T>(endpoint: string, options?: RequestInit): Promise<T> {
+  private async fetchResponse(endpoint: string, options?: RequestInit): Promise<Response> {
     const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://192.168.1.88';
 
     // Remove trailing slash if present
@@ -266,18 +275,33 @@ class AdminApiService {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      // For status 204 (No Content) don't try to parse JSON
-      if (response.status === 204) {
-        return {} as T;
-      }
-
-      return await response.json();
+      return response;
     } catch (error) {
       console.error('API request failed:', error);
       throw error;
     }
   }
 
+  private async request<T>(endpoint: string, options?: RequestInit): Promise<T> {
+    const response = await this.fetchResponse(endpoint, options);
+
+    // For status 204 (No Content) don't try to parse JSON
+    if (response.status === 204) {
+      return {} as T;
+    }
+
+    return await response.json();
+  }
+
+  // Paged list: the next page cursor comes in the X-Next-Cursor header
+  private async requestPage<T>(endpoint: string): Promise<Page<T>> {
+    const response = await this.fetchResponse(endpoint);
+    return {
+      items: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor')
+    };
+  }
+
   // Authentication endpoints
   async login(credentials: LoginCredentials): Promise<AuthResponse> {
     // In a real app, this would be a proper login endpoint
@@ -307,22 +331,22 @@ class AdminApiService {
 
   // Dashboard statistics
   async getAdminStats(): Promise<AdminStats> {
-    // This is a simplified implementation
-    // In a real app, you would have actual endpoints for these stats
-    const appointments = await this.getAppointments();
-    const customers = await this.getCustomers();
-    const services = await this.getServices();
-    const masters = await this.getMasters();
-    
-    const confirmedAppointments = appointments.filter(a => a.confirmed).length;
-    
+    const stats = await this.request<{
+      total_appointments: number;
+      confirmed_appointments: number;
+      pending_appointments: number;
+      total_customers: number;
+      total_services: number;
+      total_masters: number;
+    }>('/stats/');
+
     return {
-      totalAppointments: appointments.length,
-      confirmedAppointments,
-      pendingAppointments: appointments.length - confirmedAppointments,
-      totalCustomers: customers.length,
-      totalServices: services.length,
-      totalMasters: masters.length
+      totalAppointments: stats.total_appointments,
+      confirmedAppointments: stats.confirmed_appointments,
+      pendingAppointments: stats.pending_appointments,
+      totalCustomers: stats.total_customers,
+      totalServices: stats.total_services,
+      totalMasters: stats.total_masters
     };
   }
 
@@ -331,6 +355,21 @@ class AdminApiService {
     return this.request<Customer[]>('/customers/');
   }
 
+  async getCustomersPage(
+    options: { status?: string; cursor?: string | null; limit?: number } = {}
+  ): Promise<Page<Customer>> {
+    const params = new URLSearchParams({ limit: (options.limit ?? 50).toString() });
+    if (options.status) params.append('status', options.status);
+    if (options.cursor) params.append('cursor', options.cursor);
+    return this.requestPage<Customer>(`/customers/?${params.toString()}`);
+  }
+
+  async searchCustomers(query: string, status?: string, limit: number = 50): Promise<Customer[]> {
+    const params = new URLSearchParams({ q: query, limit: limit.toString() });
+    if (status) params.append('status', status);
+    return this.request<Customer[]>(`/customers/search/?${params.toString()}`);
+  }
+
   async updateCustomerStatus(phone: string, status: string): Promise<Customer> {
     return this.request<Customer>(`/customers/${phone}/status/`, {
       method: 'PATCH',
@@ -439,6 +478,15 @@ class AdminApiService {
     return this.request<Appointment[]>(`/appointments/${query ? `?${query}` : ''}`);
   }
 
+  async getAppointmentsPage(
+    options: { confirmed?: boolean; cursor?: string | null; limit?: number } = {}
+  ): Promise<Page<Appointment>> {
+    const params = new URLSearchParams({ limit: (options.limit ?? 50).toString() });
+    if (options.confirmed !== undefined) params.append('confirmed', options.confirmed.toString());
+    if (options.cursor) params.append('cursor', options.cursor);
+    return this.requestPage<Appointment>(`/appointments/?${params.toString()}`);
+  }
+
   async deleteAppointment(appointmentId: number): Promise<void> {
     return this.request<void>(`/appointments/${appointmentId}/`, {
       method: 'DELETE'